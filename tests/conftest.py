@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +39,11 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def temporary_cache():
+    # Тесты не должны трогать файл кэша запущенного сервера.
+    from core.testing import temporary_cache
+    with temporary_cache():
+        yield
@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import time
+from collections import Counter
+from functools import wraps
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, quote_etag
+
+logger = logging.getLogger(__name__)
+
+# Счетчики обращений к кэшу страниц в текущем процессе.
+cache_stats = Counter()
+
+
+def generation_key(namespace):
+    return f'generation:{quote(namespace)}'
+
+
+def get_generations(namespaces):
+    """Текущие поколения пространств имен кэша одним обращением.
+
+    Начальное значение берется из времени, чтобы после потери счетчика
+    ключи не совпали со страницами, сохраненными до этого.
+    """
+    keys = [generation_key(namespace) for namespace in namespaces]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, time.time_ns(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def get_generation(namespace):
+    return get_generations([namespace])[0]
+
+
+def bump_generation(*namespaces):
+    """Делает все страницы пространств имен устаревшими за O(1)."""
+    for namespace in namespaces:
+        key = generation_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def get_versions(namespaces):
+    return ':'.join(
+        f'{quote(namespace)}.{generation}' for namespace, generation in zip(
+            namespaces, get_generations(namespaces)
+        )
+    )
+
+
+def page_key(request, versions):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    user_id = request.user.pk or 0
+    return f'page:{versions}:{request.method}:{user_id}:{path}'
+
+
+def page_etag(request, versions):
+    """ETag страницы без рендера: меняется вместе с поколениями данных.
+
+    В ETag входит и CSRF-секрет из cookie: страница с формой, сохраненная
+    браузером до смены токена (например, до повторного входа), не должна
+    получить 304, иначе отправка ее формы упадет с ошибкой CSRF.
+    """
+    user_id = request.user.pk or 0
+    secret = request.META.get('CSRF_COOKIE', '')
+    return quote_etag(hashlib.md5(
+        f'{versions}:{user_id}:{secret}:{request.get_full_path()}'.encode()
+    ).hexdigest())
+
+
+def is_cacheable(request, response):
+    """Страницы с CSRF-токеном и ответы с ошибкой не кэшируются."""
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def _count(status, value):
+    cache_stats[status] += 1
+    logger.debug('cache %s', status)
+    return value, status
+
+
+def _regenerate(key, regenerate, timeout, stale_timeout, should_store):
+    """Пересчитывает значение под блокировкой и снимает ее."""
+    try:
+        value = regenerate()
+        if should_store(value):
+            cache.set(
+                key, (time.time() + timeout, value), timeout + stale_timeout
+            )
+        return value
+    finally:
+        cache.delete(f'lock:{key}')
+
+
+def _wait_for(key):
+    """Ждет значение, которое пересчитывает другой обработчик."""
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(f'lock:{key}') is None:
+            return None
+    return None
+
+
+def get_or_regenerate(
+    key, regenerate, timeout, stale_timeout=None,
+    should_store=lambda value: True
+):
+    """Кэш stale-while-revalidate с объединением одинаковых запросов.
+
+    Свежее значение отдается сразу. Устаревшее пересчитывает ровно один
+    обработчик, взявший короткую блокировку, а остальные тем временем
+    получают старое значение. При полном промахе остальные ждут результат
+    того же обработчика вместо того, чтобы считать его параллельно.
+    Возвращает пару (значение, статус: hit, stale или miss).
+    """
+    if stale_timeout is None:
+        stale_timeout = settings.CACHE_STALE_TIMEOUT
+    lock_key = f'lock:{key}'
+    entry = cache.get(key)
+    if entry is not None:
+        fresh_until, value = entry
+        if time.time() < fresh_until:
+            return _count('hit', value)
+        if not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+            return _count('stale', value)
+    elif not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        entry = _wait_for(key)
+        if entry is not None:
+            return _count('hit', entry[1])
+        return _count('miss', regenerate())
+    return _count('miss', _regenerate(
+        key, regenerate, timeout, stale_timeout, should_store
+    ))
+
+
+def versioned_cache_page(namespace, timeout=None):
+    """Кэширует страницу до смены поколения `namespace`.
+
+    `namespace` - строка или функция от аргументов представления,
+    возвращающая список пространств имен, от которых зависит страница.
+    В отличие от `cache_page`, срок жизни записи может быть долгим:
+    изменения данных сбрасывают кэш через `bump_generation`, а по
+    истечении срока страница обновляется в режиме stale-while-revalidate.
+
+    Страница получает ETag из тех же поколений; совпавший условный
+    запрос получает 304 без рендера и чтения кэша. Last-Modified не
+    отдается: время правки не растет монотонно (удаление комментария
+    его уменьшает) и не покрывает всех зависимостей страницы, так что
+    клиент с одним If-Modified-Since получил бы 304 на измененную.
+    """
+    if timeout is None:
+        timeout = settings.PAGE_CACHE_TIMEOUT
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            if callable(namespace):
+                namespaces = namespace(request, *args, **kwargs)
+            else:
+                namespaces = [namespace]
+            versions = get_versions(namespaces)
+            etag = page_etag(request, versions)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                cache_stats['not_modified'] += 1
+                response['ETag'] = etag
+                return response
+            response, status = get_or_regenerate(
+                page_key(request, versions),
+                lambda: view(request, *args, **kwargs),
+                timeout,
+                should_store=lambda response: is_cacheable(request, response)
+            )
+            response['X-Cache'] = status
+            if request.META.get('CSRF_COOKIE_USED'):
+                # Рендер мог выдать или сменить токен: ETag - по новому.
+                etag = page_etag(request, versions)
+            if response.status_code == 200:
+                response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,391 @@
+import mmap
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SIGNAL_FORMAT = '<Q'
+SIGNAL_SIZE = struct.calcsize(SIGNAL_FORMAT)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS invalidation (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT
+);
+'''
+
+
+class LocalTier:
+    """Маленький LRU-кэш процесса (L1) с отметкой о прочитанном журнале.
+
+    Как и LocMemCache, хранит значения в pickle: каждый `get` получает
+    свою копию, и потоки не меняют общий объект.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.signal = None
+        self.seq = None
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires):
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SharedSQLiteCache(BaseCache):
+    """Кэш, общий для всех процессов одной машины, без внешних сервисов.
+
+    Второй уровень (L2) - файл SQLite в режиме WAL. Перед ним в каждом
+    процессе стоит небольшой LRU (L1). Любая запись или удаление ключа
+    добавляет строку в журнал инвалидации и пишет ее номер в общий
+    mmap-файл; перед чтением процесс сравнивает этот номер со своим
+    и, если он изменился, выбрасывает из L1 ключи, перечисленные в
+    журнале. Так проверка актуальности L1 стоит одного чтения памяти.
+
+    Параметры OPTIONS: MAX_ENTRIES и CULL_FREQUENCY (как у кэшей Django
+    в БД и в файлах), L1_MAX_ENTRIES, CULL_FREQUENCY_SETS (как часто
+    чистить просроченные записи) и LOG_MAX_ENTRIES (длина журнала).
+    """
+
+    _tiers = {}
+    _tiers_lock = threading.Lock()
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self.cull_every = int(options.get('CULL_FREQUENCY_SETS', 1000))
+        self.log_max_entries = int(options.get('LOG_MAX_ENTRIES', 10000))
+        self._local = threading.local()
+        self._sets = 0
+
+    # Соединения и общий сигнал
+
+    def _tier(self):
+        pid = os.getpid()
+        tier = self._tiers.get(self.path)
+        if tier is None or tier.pid != pid:
+            with self._tiers_lock:
+                tier = self._tiers.get(self.path)
+                if tier is None or tier.pid != pid:
+                    tier = LocalTier(self.l1_max_entries)
+                    self._tiers[self.path] = tier
+        return tier
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None,
+                check_same_thread=False
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            local.connection = connection
+            local.signal = self._open_signal()
+            local.pid = os.getpid()
+        return local.connection
+
+    def _open_signal(self):
+        with open(self.path + '.signal', 'a+b') as signal_file:
+            if os.fstat(signal_file.fileno()).st_size < SIGNAL_SIZE:
+                signal_file.write(b'\0' * SIGNAL_SIZE)
+                signal_file.flush()
+            return mmap.mmap(signal_file.fileno(), SIGNAL_SIZE)
+
+    def _read_signal(self):
+        self._connection()
+        return struct.unpack_from(SIGNAL_FORMAT, self._local.signal)[0]
+
+    def _publish(self, connection, keys):
+        """Записывает ключи в журнал; возвращает номер последней записи.
+
+        Ключ None означает очистку всего кэша.
+        """
+        seq = None
+        for key in keys:
+            seq = connection.execute(
+                'INSERT INTO invalidation (key) VALUES (?)', (key,)
+            ).lastrowid
+        return seq
+
+    def _signal(self, seq):
+        """Сообщает остальным процессам о новой записи журнала.
+
+        Запись 8 выровненных байт не рвется, а порядок записей разными
+        процессами не важен: читатель реагирует на любое изменение и
+        дочитывает журнал по своему номеру, а не по значению сигнала.
+        """
+        if seq is not None:
+            struct.pack_into(SIGNAL_FORMAT, self._local.signal, 0, seq)
+
+    def _sync(self):
+        """Выбрасывает из L1 ключи, измененные другими процессами."""
+        tier = self._tier()
+        signal = self._read_signal()
+        if signal == tier.signal:
+            return tier
+        connection = self._connection()
+        if tier.seq is None:
+            rows = []
+            last = connection.execute(
+                'SELECT MAX(seq) FROM invalidation'
+            ).fetchone()[0] or 0
+        else:
+            first = connection.execute(
+                'SELECT MIN(seq) FROM invalidation'
+            ).fetchone()[0]
+            rows = connection.execute(
+                'SELECT seq, key FROM invalidation WHERE seq > ?', (tier.seq,)
+            ).fetchall()
+            if first is not None and first > tier.seq + 1:
+                tier.clear()
+            last = rows[-1][0] if rows else tier.seq
+        if any(key is None for _, key in rows):
+            tier.clear()
+        else:
+            tier.discard(key for _, key in rows)
+        tier.seq = last
+        tier.signal = signal
+        return tier
+
+    def _write(self, statements, keys):
+        """Выполняет изменения и журнал в одной транзакции."""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = statements(connection)
+            seq = self._publish(connection, keys)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._signal(seq)
+        return result
+
+    # Вспомогательные методы
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _cull(self, connection):
+        """Держит в L2 не больше MAX_ENTRIES записей.
+
+        Как в кэше Django в БД: сначала удаляются просроченные записи,
+        а если их не хватило - доля 1/CULL_FREQUENCY, причем первыми
+        те, что истекают раньше всех, а бессрочные счетчики поколений -
+        последними. CULL_FREQUENCY = 0 очищает кэш целиком. Значения
+        удаленных записей верны, поэтому L1 их не выбрасывает.
+        """
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        count -= connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),)
+        ).rowcount
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+            'ORDER BY expires IS NULL, expires LIMIT ?)',
+            (count // self._cull_frequency,)
+        )
+
+    def _maybe_cull(self, connection):
+        self._cull(connection)
+        self._sets += 1
+        if self._sets % self.cull_every:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),)
+        )
+        connection.execute(
+            'DELETE FROM invalidation WHERE seq <= '
+            '(SELECT MAX(seq) FROM invalidation) - ?',
+            (self.log_max_entries,)
+        )
+
+    # API кэша Django
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return time.time() + timeout
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        tier = self._sync()
+        made = {self._key(key, version): key for key in keys}
+        found = {}
+        missing = []
+        for made_key, key in made.items():
+            entry = tier.get(made_key)
+            if entry is None:
+                missing.append(made_key)
+            else:
+                found[key] = pickle.loads(entry[0])
+        if missing:
+            placeholders = ', '.join('?' * len(missing))
+            rows = self._connection().execute(
+                f'SELECT key, value, expires FROM cache '
+                f'WHERE key IN ({placeholders}) '
+                f'AND (expires IS NULL OR expires > ?)',
+                (*missing, time.time())
+            ).fetchall()
+            for made_key, value, expires in rows:
+                tier.set(made_key, value, expires)
+                found[made[made_key]] = pickle.loads(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self._key(key, version), pickle.dumps(value, -1), expires)
+            for key, value in data.items()
+        ]
+
+        def statements(connection):
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                rows
+            )
+            self._maybe_cull(connection)
+
+        self._write(statements, [row[0] for row in rows])
+        tier = self._tier()
+        for made_key, value, expires in rows:
+            tier.set(made_key, value, expires)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+
+        def statements(connection):
+            row = connection.execute(
+                'SELECT expires FROM cache WHERE key = ?', (made_key,)
+            ).fetchone()
+            if row is not None and (row[0] is None or row[0] > time.time()):
+                return False
+            connection.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (made_key, pickle.dumps(value, -1), expires)
+            )
+            return True
+
+        return self._write(statements, [made_key])
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        return bool(self._write(lambda connection: connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (expires, made_key, time.time())
+        ).rowcount, [made_key]))
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: значение меняется под блокировкой."""
+        made_key = self._key(key, version)
+
+        def statements(connection):
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (made_key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, -1), made_key)
+            )
+            return value
+
+        value = self._write(statements, [made_key])
+        self._tier().discard([made_key])
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        made_keys = [self._key(key, version) for key in keys]
+        self._write(lambda connection: connection.executemany(
+            'DELETE FROM cache WHERE key = ?',
+            [(made_key,) for made_key in made_keys]
+        ), made_keys)
+        self._tier().discard(made_keys)
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def clear(self):
+        self._write(
+            lambda connection: connection.execute('DELETE FROM cache'),
+            [None]
+        )
+        self._tier().clear()
+
+    def close(self, **kwargs):
+        """Соединение переиспользуется между запросами потока."""
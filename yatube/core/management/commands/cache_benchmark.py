@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import SharedSQLiteCache
+
+PAYLOAD = 'x' * 2048
+
+
+def make_backend(name, location, keys):
+    if name == 'locmem':
+        return LocMemCache('benchmark', {
+            'TIMEOUT': None, 'OPTIONS': {'MAX_ENTRIES': keys}
+        })
+    return SharedSQLiteCache(location, {'TIMEOUT': None})
+
+
+def run_worker(name, location, operations, keys, write_ratio, seed):
+    """Один процесс: чтения по закону Ципфа, промах пересчитывает значение,
+    доля операций - инвалидации ключей, как при изменении данных.
+    """
+    cache = make_backend(name, location, keys)
+    generator = random.Random(seed)
+    weights = [1 / rank for rank in range(1, keys + 1)]
+    chosen = generator.choices(range(keys), weights, k=operations)
+    hits = reads = 0
+    latencies = []
+    for number in chosen:
+        key = f'key:{number}'
+        if generator.random() < write_ratio:
+            cache.delete(key)
+            continue
+        started = time.perf_counter_ns()
+        value = cache.get(key)
+        latencies.append(time.perf_counter_ns() - started)
+        reads += 1
+        if value is None:
+            cache.set(key, PAYLOAD)
+        else:
+            hits += 1
+    return hits, reads, latencies
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает долю попаданий и задержку чтения общего кэша '
+        'SQLite с locmem при разном числе процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, nargs='+', default=[1, 4, 16],
+            help='Числа процессов для прогонов'
+        )
+        parser.add_argument(
+            '--operations', type=int, default=20000,
+            help='Операций на процесс'
+        )
+        parser.add_argument(
+            '--keys', type=int, default=2000,
+            help='Число различных ключей'
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.01,
+            help='Доля операций, сбрасывающих ключ'
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'{"backend":<8} {"procs":>5} {"hit rate":>9} {"mean µs":>9} '
+            f'{"p50 µs":>8} {"p99 µs":>8} {"reads/s":>10}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for processes in options['processes']:
+                for name in ('locmem', 'shared'):
+                    location = os.path.join(
+                        directory, f'{name}-{processes}.sqlite3'
+                    )
+                    arguments = [
+                        (
+                            name, location, options['operations'],
+                            options['keys'], options['write_ratio'], seed
+                        )
+                        for seed in range(processes)
+                    ]
+                    started = time.perf_counter()
+                    with context.Pool(processes) as pool:
+                        results = pool.starmap(run_worker, arguments)
+                    elapsed = time.perf_counter() - started
+                    self.report(name, processes, results, elapsed)
+
+    def report(self, name, processes, results, elapsed):
+        hits = sum(result[0] for result in results)
+        reads = sum(result[1] for result in results)
+        latencies = sorted(
+            latency for result in results for latency in result[2]
+        )
+        self.stdout.write(
+            f'{name:<8} {processes:>5} {hits / reads:>9.1%} '
+            f'{statistics.mean(latencies) / 1000:>9.1f} '
+            f'{percentile(latencies, 0.5) / 1000:>8.1f} '
+            f'{percentile(latencies, 0.99) / 1000:>8.1f} '
+            f'{reads / elapsed:>10.0f}'
+        )
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.http import Http404
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу сортировки (keyset) без OFFSET и COUNT.
+
+    Страница выбирается условием на последний показанный ключ, поэтому
+    стоимость запроса не зависит от того, насколько далеко листает
+    пользователь. Переход по номеру страницы (`get_page`) сохранен
+    для старых ссылок вида `?page=N`.
+
+    Подкласс с `numbered = False` номеров не знает: открывается только
+    первая страница, а `?page=N` дальше нее дает 404, а не первую
+    страницу под чужим номером.
+    """
+    numbered = True
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        super().__init__(object_list, per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+
+    def get_page(self, number):
+        if not self.numbered:
+            if str(number) != '1':
+                raise Http404('Страницы листаются только по курсору.')
+            return self.get_cursor_page(None)
+        page = super().get_page(number)
+        page.object_list = list(page.object_list)
+        self.set_cursors(
+            page, page.has_next(), page.has_previous(), page.number
+        )
+        return page
+
+    def get_cursor_page(self, cursor):
+        """Возвращает страницу, следующую за ключом из `cursor`."""
+        backwards, values, number = self.decode_cursor(cursor)
+        items = self.fetch(values, backwards, self.per_page + 1)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if backwards:
+            items.reverse()
+            page = Page(items, number, self)
+            self.set_cursors(page, True, has_more, number)
+        else:
+            page = Page(items, number, self)
+            self.set_cursors(page, has_more, values is not None, number)
+            if not items and values is not None:
+                page.previous_cursor = self.encode_cursor(
+                    True, values, max(number - 1, 1)
+                )
+        return page
+
+    def fetch(self, values, backwards, limit):
+        """Читает `limit` объектов после ключа `values`."""
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self.seek(values, backwards))
+        ordering = self.ordering
+        if backwards:
+            ordering = tuple(self.reverse_order(name) for name in ordering)
+        return list(queryset.order_by(*ordering)[:limit])
+
+    def seek(self, values, backwards):
+        """Условие "строго после ключа" в порядке сортировки.
+
+        Первое поле дополнительно ограничено нестрогим неравенством,
+        чтобы база могла начать поиск по индексу с нужного места.
+        """
+        lookups = [
+            self.lookup(name, backwards) for name in self.ordering
+        ]
+        condition = Q()
+        for position, lookup in enumerate(lookups):
+            equal = dict(zip(self.fields[:position], values[:position]))
+            condition |= Q(**equal, **{lookup: values[position]})
+        return Q(**{lookups[0] + 'e': values[0]}) & condition
+
+    @staticmethod
+    def lookup(name, backwards):
+        descending = name.startswith('-')
+        return '{}__{}'.format(
+            name.lstrip('-'), 'lt' if descending != backwards else 'gt'
+        )
+
+    @staticmethod
+    def reverse_order(name):
+        return name[1:] if name.startswith('-') else '-' + name
+
+    def key(self, obj):
+        return tuple(getattr(obj, name) for name in self.fields)
+
+    def set_cursors(self, page, has_next, has_previous, number):
+        items = page.object_list
+        page.next_cursor = page.previous_cursor = None
+        if items and has_next:
+            page.next_cursor = self.encode_cursor(
+                False, self.key(items[-1]), number + 1
+            )
+        if items and has_previous:
+            page.previous_cursor = self.encode_cursor(
+                True, self.key(items[0]), max(number - 1, 1)
+            )
+
+    def encode_cursor(self, backwards, values, number):
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ]
+        data = json.dumps([int(backwards), values, number]).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Разбирает курсор; испорченный курсор ведет на первую страницу."""
+        if not cursor:
+            return False, None, 1
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            backwards, values, number = json.loads(data.decode())
+            model = self.object_list.model
+            values = tuple(
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            )
+            if len(values) != len(self.fields) or None in values:
+                raise ValueError
+            return bool(backwards), values, max(int(number), 1)
+        except (
+            binascii.Error, TypeError, ValueError, ValidationError
+        ):
+            return False, None, 1
+
+
+class ValuesCursorPaginator(CursorPaginator):
+    """CursorPaginator для queryset из `.values()`: строки - словари.
+
+    Поля ключа сортировки должны входить в выбранные значения.
+    """
+
+    def key(self, row):
+        return tuple(row[name] for name in self.fields)
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, называющее файлы по SHA-256 содержимого.
+
+    Файл `posts/cat.jpg` сохраняется как `posts/ab/ab…ef.jpg`; одинаковое
+    содержимое дает одно имя, поэтому повторная загрузка не пишет на
+    диск ничего нового. Запись идет во временный файл рядом с целевым
+    и переименовывается атомарно, так что параллельные загрузки одного
+    файла не мешают друг другу. Удалять такие файлы можно только когда
+    на них больше никто не ссылается.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def get_available_name(self, name, max_length=None):
+        """Имя определяется содержимым в `_save`, а не перебором."""
+        return name
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if not self.exists(name):
+            self._write(name, content)
+        return name
+
+    def restore(self, name, content):
+        """Записывает содержимое под готовым именем, если файла нет.
+
+        Нужно, когда `_save` застал файл на месте, а к моменту записи
+        ссылки на него другой запрос успел его удалить.
+        """
+        if self.exists(name):
+            return False
+        self._write(name, content)
+        return True
+
+    def _write(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    temp_file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
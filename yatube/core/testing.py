@@ -0,0 +1,58 @@
+import copy
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+class QueryBudgetMixin:
+    """Проверка, что код укладывается в бюджет запросов к базе."""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                query['sql'] for query in context.captured_queries
+            )
+            self.fail(
+                f'Выполнено {executed} запросов при бюджете {budget}:\n'
+                f'{queries}'
+            )
+
+
+@contextmanager
+def temporary_cache():
+    """Кэш по умолчанию во временном каталоге, который потом удаляется.
+
+    Тесты часто вызывают `cache.clear()`: с настоящим файлом кэша это
+    стирало бы кэш запущенного сервера, а данные переживали бы запуск.
+    """
+    directory = tempfile.mkdtemp()
+    caches = copy.deepcopy(settings.CACHES)
+    caches['default']['LOCATION'] = os.path.join(directory, 'cache.sqlite3')
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TemporaryCacheRunner(DiscoverRunner):
+    """manage.py test с кэшем из `temporary_cache`."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_context = temporary_cache()
+        self.cache_context.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_context.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -1,4 +1,18 @@
-from django.test import TestCase
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from .cache import get_or_regenerate
+from .cache_backends import SharedSQLiteCache
+from .storage import ContentAddressedStorage
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +20,172 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class StaleWhileRevalidateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def tearDown(self):
+        cache.clear()
+
+    def regenerate(self):
+        self.calls += 1
+        return f'значение {self.calls}'
+
+    def test_fresh_value_is_hit(self):
+        """Свежее значение считается один раз и дальше отдается из кэша."""
+        get_or_regenerate('key', self.regenerate, 60)
+        value, status = get_or_regenerate('key', self.regenerate, 60)
+        self.assertEqual((value, status), ('значение 1', 'hit'))
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_is_served_during_refresh(self):
+        """Пока один обработчик пересчитывает, остальные получают старое."""
+        get_or_regenerate('key', self.regenerate, 0)
+        cache.add('lock:key', 1)
+        value, status = get_or_regenerate('key', self.regenerate, 0)
+        self.assertEqual((value, status), ('значение 1', 'stale'))
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_is_refreshed_once(self):
+        """Устаревшее значение пересчитывает обработчик с блокировкой."""
+        get_or_regenerate('key', self.regenerate, 0)
+        value, status = get_or_regenerate('key', self.regenerate, 60)
+        self.assertEqual((value, status), ('значение 2', 'miss'))
+        self.assertIsNone(cache.get('lock:key'))
+        value, status = get_or_regenerate('key', self.regenerate, 60)
+        self.assertEqual((value, status), ('значение 2', 'hit'))
+
+    @override_settings(CACHE_LOCK_TIMEOUT=1, CACHE_LOCK_POLL_INTERVAL=0.01)
+    def test_concurrent_miss_waits_for_owner(self):
+        """При промахе второй запрос ждет результат первого."""
+        cache.add('lock:key', 1)
+        timer = threading.Timer(0.05, lambda: cache.set(
+            'key', (time.time() + 60, 'готово'), 60
+        ))
+        timer.start()
+        value, status = get_or_regenerate('key', self.regenerate, 60)
+        timer.join()
+        self.assertEqual((value, status), ('готово', 'hit'))
+        self.assertEqual(self.calls, 0)
+
+
+def _set_in_child(location, key, value):
+    """Запись из другого процесса со своим L1."""
+    SharedSQLiteCache(location, {}).set(key, value)
+
+
+class SharedSQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SharedSQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """Кэш поддерживает операции, которые использует проект."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertTrue(self.cache.add('other', 2))
+        self.assertEqual(
+            self.cache.get_many(['key', 'other', 'missing']),
+            {'key': {'value': 1}, 'other': 2}
+        )
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.get('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('other'))
+
+    def test_expired_values_are_missing(self):
+        """Просроченное значение не отдается ни из L1, ни из файла."""
+        self.cache.set('key', 1, 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 2, 60))
+
+    def test_local_tier_returns_copies(self):
+        """Каждое попадание в L1 отдает свою копию значения."""
+        value = {'headers': ['a']}
+        self.cache.set('key', value)
+        value['headers'].append('после записи')
+        first = self.cache.get('key')
+        first['headers'].append('из первого запроса')
+        second = self.cache.get('key')
+        self.assertIsNot(first, second)
+        self.assertEqual(second, {'headers': ['a']})
+        self.cache._tier().clear()
+        self.assertIsNot(self.cache.get('key'), self.cache.get('key'))
+
+    def test_max_entries_are_culled(self):
+        """Файл не растет больше MAX_ENTRIES; бессрочные ключи живут."""
+        cache = SharedSQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}
+        })
+        cache.set('generation', 1, None)
+        for i in range(50):
+            cache.set(f'page:{i}', i, 60 + i)
+        rows = cache._connection().execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()[0]
+        self.assertLessEqual(rows, 11)
+        cache._tier().clear()
+        self.assertEqual(cache.get('generation'), 1)
+        self.assertEqual(cache.get('page:49'), 49)
+        self.assertIsNone(cache.get('page:0'))
+
+    def test_tests_use_temporary_cache(self):
+        """Тесты не трогают файл кэша в каталоге проекта."""
+        self.assertNotEqual(
+            os.path.dirname(settings.CACHES['default']['LOCATION']),
+            settings.BASE_DIR
+        )
+
+    def test_other_process_invalidates_local_tier(self):
+        """Запись из другого процесса сбрасывает значение в L1."""
+        self.cache.set('key', 'старое')
+        self.assertEqual(self.cache.get('key'), 'старое')
+        child = multiprocessing.get_context('fork').Process(
+            target=_set_in_child, args=(self.location, 'key', 'новое')
+        )
+        child.start()
+        child.join()
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(self.cache.get('key'), 'новое')
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковое содержимое сохраняется в один файл."""
+        first = self.storage.save('posts/cat.JPG', ContentFile(b'data'))
+        second = self.storage.save('posts/dog.jpg', ContentFile(b'data'))
+        self.assertEqual(first, second)
+        self.assertRegex(first, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(
+            os.listdir(os.path.dirname(self.storage.path(first))),
+            [os.path.basename(first)]
+        )
+
+    def test_different_content_gets_different_names(self):
+        """Разное содержимое с одинаковым именем не перезаписывается."""
+        first = self.storage.save('posts/cat.jpg', ContentFile(b'one'))
+        second = self.storage.save('posts/cat.jpg', ContentFile(b'two'))
+        self.assertNotEqual(first, second)
+        with self.storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'one')
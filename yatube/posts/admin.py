@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post, Comment, Follow
+from .search import matching_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -16,6 +17,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE по всем постам."""
+        if not search_term:
+            return queryset, False
+        return matching_posts(queryset, search_term), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
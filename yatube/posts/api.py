@@ -0,0 +1,236 @@
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from core.cache import versioned_cache_page
+from core.paginator import ValuesCursorPaginator
+
+from .caching import (
+    INDEX_NAMESPACE, group_page, post_meta, post_page, profile_page
+)
+from .feeds import FeedPaginator
+from .models import Comment, FeedItem, Group, Post, User
+from .thumbnails import find_thumbnails
+from .utils import COMMENT_ORDERING, POST_ORDERING
+
+# Поле ответа -> столбец `.values()`, из которого оно берется.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'comments_count': 'comments_count',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'thumbnail': 'image',
+}
+# Ленты кэшируются по поколениям ленты, группы и автора, а комментарии
+# сбрасывают только страницу поста: счетчик комментариев в лентах
+# устаревал бы, поэтому он есть только в ответе о посте.
+FEED_FIELDS = {
+    name: column for name, column in POST_FIELDS.items()
+    if name != 'comments_count'
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def json_api(view):
+    """Ошибки API отдаются в JSON, а не страницей ошибки."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response({'detail': str(error)}, error.status)
+    return wrapper
+
+
+def requested_fields(request, available):
+    """Поля из `?fields=a,b`; без параметра - все доступные."""
+    value = request.GET.get('fields')
+    if not value:
+        return list(available)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise ApiError('Неизвестные поля: {}. Доступны: {}.'.format(
+            ', '.join(unknown), ', '.join(available)
+        ))
+    return list(dict.fromkeys(fields))
+
+
+def columns(available, fields, ordering):
+    """Столбцы для `.values()`: выбранные поля плюс ключ сортировки."""
+    names = {available[field] for field in fields}
+    names.update(name.lstrip('-') for name in ordering)
+    return sorted(names)
+
+
+def thumbnail_data(thumbnail, srcset):
+    if thumbnail is None:
+        return None
+    return {
+        'url': thumbnail.url,
+        'width': thumbnail.width,
+        'height': thumbnail.height,
+        'srcset': srcset['default'],
+        'srcset_webp': srcset['webp'],
+    }
+
+
+def serialize_posts(rows, fields):
+    """Словари ответа из строк `.values()`; модели не создаются."""
+    storage = Post._meta.get_field('image').storage
+    thumbnails = {}
+    if 'thumbnail' in fields:
+        thumbnails = find_thumbnails(row['image'] for row in rows)
+    result = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            value = row[POST_FIELDS[field]]
+            if field == 'thumbnail':
+                value = thumbnail_data(*thumbnails.get(value, (None, None)))
+            elif field == 'image':
+                value = storage.url(value) if value else None
+            item[field] = value
+        result.append(item)
+    return result
+
+
+def page_response(page, results):
+    return json_response({
+        'results': results,
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+def posts_response(request, paginator, fields):
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
+    return page_response(page, serialize_posts(page.object_list, fields))
+
+
+def feed_response(request, queryset):
+    fields = requested_fields(request, FEED_FIELDS)
+    rows = queryset.values(*columns(FEED_FIELDS, fields, POST_ORDERING))
+    paginator = ValuesCursorPaginator(
+        rows, settings.POSTS_PER_PAGE, POST_ORDERING
+    )
+    return posts_response(request, paginator, fields)
+
+
+class FeedValuesPaginator(FeedPaginator):
+    """Лента подписок строками `.values()` только с нужными столбцами."""
+    stream_class = ValuesCursorPaginator
+
+    def __init__(self, user, per_page, columns):
+        self.columns = columns
+        super().__init__(user, per_page)
+
+    def inbox(self, user):
+        return FeedItem.objects.filter(user=user).values(
+            *('post__' + name for name in self.columns)
+        )
+
+    def author_posts(self, author_id):
+        return Post.objects.filter(author_id=author_id).values(*self.columns)
+
+    def unpack(self, item):
+        return {name: item['post__' + name] for name in self.columns}
+
+    def key(self, row):
+        return row['pub_date'], row['id']
+
+
+@versioned_cache_page(INDEX_NAMESPACE)
+@json_api
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@versioned_cache_page(group_page)
+@json_api
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        raise ApiError('Группа не найдена.', 404)
+    return feed_response(request, Post.objects.filter(group_id=group_id))
+
+
+@versioned_cache_page(profile_page)
+@json_api
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if author_id is None:
+        raise ApiError('Автор не найден.', 404)
+    return feed_response(request, Post.objects.filter(author_id=author_id))
+
+
+@json_api
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужно войти на сайт.', 401)
+    fields = requested_fields(request, FEED_FIELDS)
+    paginator = FeedValuesPaginator(
+        request.user,
+        settings.POSTS_PER_PAGE,
+        columns(FEED_FIELDS, fields, POST_ORDERING)
+    )
+    return posts_response(request, paginator, fields)
+
+
+@versioned_cache_page(post_page)
+@json_api
+def post_detail(request, post_id):
+    fields = requested_fields(request, POST_FIELDS)
+    row = Post.objects.filter(pk=post_id).values(
+        *columns(POST_FIELDS, fields, POST_ORDERING)
+    ).first()
+    if row is None:
+        raise ApiError('Пост не найден.', 404)
+    return json_response(serialize_posts([row], fields)[0])
+
+
+@versioned_cache_page(post_page)
+@json_api
+def post_comments(request, post_id):
+    if post_meta(request, post_id)[0] is None:
+        raise ApiError('Пост не найден.', 404)
+    fields = requested_fields(request, COMMENT_FIELDS)
+    rows = Comment.objects.filter(post_id=post_id).order_by(
+        *COMMENT_ORDERING
+    ).values(*columns(COMMENT_FIELDS, fields, COMMENT_ORDERING))
+    page = ValuesCursorPaginator(
+        rows, settings.COMMENTS_PER_PAGE, COMMENT_ORDERING
+    ).get_cursor_page(request.GET.get('cursor'))
+    return page_response(page, [
+        {field: row[COMMENT_FIELDS[field]] for field in fields}
+        for row in page.object_list
+    ])
@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(using='default', **kwargs):
+    from .search import install_index
+    install_index(using)
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(install_search_index, sender=self)
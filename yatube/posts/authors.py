@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.urls import reverse
+
+from .models import AuthorName
+
+# Поля пользователя, из которых строятся ключи поиска.
+NAME_FIELDS = {'username', 'first_name', 'last_name'}
+# Больше ключей, чем здесь, у одного пользователя не бывает.
+KEYS_PER_USER = 4
+# Длиннее самого длинного ключа префикс быть не может.
+MAX_PREFIX_LENGTH = 301
+# Строка, большая любой строки с данным префиксом.
+PREFIX_END = '\U0010ffff'
+
+
+def normalize(value):
+    return ' '.join(value.split()).casefold()
+
+
+def name_keys(user):
+    """Ключи пользователя: логин, имя, фамилия и "имя фамилия"."""
+    full_name = user.get_full_name()
+    keys = {
+        normalize(value) for value in (
+            user.username, user.first_name, user.last_name, full_name
+        )
+    }
+    keys.discard('')
+    return keys
+
+
+def author_names(user):
+    """Несохраненные строки ключей поиска пользователя."""
+    return [
+        AuthorName(
+            user=user,
+            key=key,
+            username=user.username,
+            full_name=user.get_full_name(),
+        )
+        for key in name_keys(user)
+    ]
+
+
+def index_author(user):
+    """Пересобирает ключи поиска пользователя."""
+    with transaction.atomic():
+        AuthorName.objects.filter(user=user).delete()
+        AuthorName.objects.bulk_create(author_names(user))
+
+
+def autocomplete(query, limit):
+    """Авторы, у которых логин, имя или фамилия начинаются с `query`.
+
+    Один запрос по индексу ключей: диапазон [префикс, префикс + max)
+    уже отсортирован, поэтому читается не больше
+    `limit * KEYS_PER_USER` строк при любом числе пользователей.
+    """
+    prefix = normalize(query)[:MAX_PREFIX_LENGTH]
+    if not prefix:
+        return []
+    rows = AuthorName.objects.filter(
+        key__gte=prefix, key__lt=prefix + PREFIX_END
+    ).order_by('key').values_list(
+        'user_id', 'username', 'full_name'
+    )[:limit * KEYS_PER_USER]
+    results = {}
+    for user_id, username, full_name in rows:
+        if user_id not in results:
+            results[user_id] = {
+                'username': username,
+                'name': full_name,
+                'url': reverse('posts:profile', args=[username]),
+            }
+            if len(results) == limit:
+                break
+    return list(results.values())
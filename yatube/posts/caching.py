@@ -0,0 +1,114 @@
+from core.cache import bump_generation
+
+from .models import Comment, Group, Post, User
+
+INDEX_NAMESPACE = 'index_page'
+
+
+def group_namespace(slug):
+    return f'group:{slug}'
+
+
+def author_namespace(username):
+    return f'author:{username}'
+
+
+def post_namespace(post_id):
+    return f'post:{post_id}'
+
+
+def author_name_namespace(user_id):
+    """Поколение имени автора: входит в ключи карточек его постов."""
+    return f'author_name:{user_id}'
+
+
+def group_name_namespace(group_id):
+    """Поколение названия и адреса группы: входит в ключи карточек."""
+    return f'group_name:{group_id}'
+
+
+def group_page(request, slug):
+    return [group_namespace(slug)]
+
+
+def profile_page(request, username):
+    return [author_namespace(username)]
+
+
+def post_meta(request, post_id):
+    """Автор и группа поста: один запрос на запрос."""
+    if not hasattr(request, 'post_meta'):
+        request.post_meta = Post.objects.filter(pk=post_id).values_list(
+            'author__username', 'group_id'
+        ).first() or (None, None)
+    return request.post_meta
+
+
+def post_page(request, post_id):
+    """Страница поста зависит от поста, счетчиков автора и его группы."""
+    username, group_id = post_meta(request, post_id)
+    namespaces = [post_namespace(post_id), author_namespace(username)]
+    if group_id:
+        namespaces.append(group_name_namespace(group_id))
+    return namespaces
+
+
+def invalidate_authors(*user_ids):
+    bump_generation(*(
+        author_namespace(username)
+        for username in User.objects.filter(pk__in=user_ids).values_list(
+            'username', flat=True
+        )
+    ))
+
+
+def invalidate_groups(*group_ids):
+    bump_generation(*(
+        group_namespace(slug)
+        for slug in Group.objects.filter(pk__in=group_ids).values_list(
+            'slug', flat=True
+        )
+    ))
+
+
+def invalidate_post(post, old_group_id=None):
+    """Сбрасывает закэшированные страницы, на которых виден пост."""
+    bump_generation(INDEX_NAMESPACE, post_namespace(post.pk))
+    invalidate_authors(post.author_id)
+    invalidate_groups(post.group_id, old_group_id)
+
+
+def invalidate_author_name(user_id, *usernames):
+    """Сбрасывает страницы и карточки, на которых видно имя автора."""
+    group_ids = Post.objects.filter(author_id=user_id).exclude(
+        group=None
+    ).order_by().values_list('group_id', flat=True).distinct()
+    post_ids = Comment.objects.filter(author_id=user_id).order_by(
+    ).values_list('post_id', flat=True).distinct()
+    bump_generation(
+        INDEX_NAMESPACE,
+        author_name_namespace(user_id),
+        *(author_namespace(username) for username in usernames),
+        *(post_namespace(post_id) for post_id in post_ids)
+    )
+    invalidate_groups(*group_ids)
+
+
+def group_author_ids(group_id):
+    return list(Post.objects.filter(group_id=group_id).order_by().values_list(
+        'author_id', flat=True
+    ).distinct())
+
+
+def invalidate_group_name(group_id, slugs, author_ids):
+    """Сбрасывает страницы и карточки со ссылкой на группу.
+
+    `slugs` - прежний и новый адрес группы, `author_ids` - авторы ее
+    постов: их профили показывают карточки со ссылкой на группу.
+    """
+    bump_generation(
+        INDEX_NAMESPACE,
+        group_name_namespace(group_id),
+        *(group_namespace(slug) for slug in slugs if slug)
+    )
+    invalidate_authors(*author_ids)
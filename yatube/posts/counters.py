@@ -0,0 +1,132 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _shifted(field, delta):
+    """Новое значение счетчика; ниже нуля не опускается.
+
+    Загрузка фикстур не увеличивает счетчики, а удаление загруженной
+    записи их уменьшает: без нижней границы UPDATE нарушил бы CHECK
+    положительного поля.
+    """
+    return Greatest(F(field) + delta, 0)
+
+
+def bump_user(user_id, delta, *fields):
+    """Сдвигает счетчики пользователя на `delta` одним UPDATE."""
+    changes = {field: _shifted(field, delta) for field in fields}
+    with transaction.atomic():
+        updated = UserStats.objects.filter(user_id=user_id).update(**changes)
+        if not updated and delta > 0:
+            UserStats.objects.get_or_create(user_id=user_id)
+            UserStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shifted('comments_count', delta)
+    )
+
+
+def post_added(post):
+    bump_user(post.author_id, 1, 'posts_count')
+
+
+def post_removed(post):
+    bump_user(post.author_id, -1, 'posts_count')
+
+
+def follow_added(follow):
+    with transaction.atomic():
+        bump_user(follow.author_id, 1, 'followers_count')
+        bump_user(follow.user_id, 1, 'following_count')
+
+
+def follow_removed(follow):
+    with transaction.atomic():
+        bump_user(follow.author_id, -1, 'followers_count')
+        bump_user(follow.user_id, -1, 'following_count')
+
+
+def _counts(queryset, field, ids):
+    # Сортировка модели попала бы в GROUP BY и разбила бы группы.
+    return dict(
+        queryset.filter(**{field + '__in': ids}).order_by().values(
+            field
+        ).annotate(
+            total=Count('pk')
+        ).values_list(field, 'total')
+    )
+
+
+def _batches(queryset, batch_size):
+    """Первичные ключи таблицы пачками по возрастанию."""
+    last = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last).order_by('pk').values_list(
+            'pk', flat=True
+        )[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def reconcile_posts(batch_size):
+    """Пересчитывает число комментариев; возвращает число исправлений."""
+    fixed = 0
+    for ids in _batches(Post.objects.all(), batch_size):
+        with transaction.atomic():
+            actual = _counts(Comment.objects.all(), 'post_id', ids)
+            drifted = [
+                Post(pk=pk, comments_count=actual.get(pk, 0))
+                for pk, stored in Post.objects.filter(pk__in=ids).values_list(
+                    'pk', 'comments_count'
+                )
+                if stored != actual.get(pk, 0)
+            ]
+            Post.objects.bulk_update(drifted, ['comments_count'])
+        fixed += len(drifted)
+    return fixed
+
+
+def reconcile_users(batch_size):
+    """Пересчитывает счетчики пользователей; возвращает число исправлений."""
+    fields = ('posts_count', 'followers_count', 'following_count')
+    fixed = 0
+    for ids in _batches(User.objects.all(), batch_size):
+        with transaction.atomic():
+            actual = {
+                'posts_count': _counts(Post.objects.all(), 'author_id', ids),
+                'followers_count': _counts(
+                    Follow.objects.all(), 'author_id', ids
+                ),
+                'following_count': _counts(
+                    Follow.objects.all(), 'user_id', ids
+                ),
+            }
+            stats = UserStats.objects.in_bulk(ids, field_name='user_id')
+            missing = [
+                UserStats(user_id=pk) for pk in ids if pk not in stats
+            ]
+            UserStats.objects.bulk_create(missing)
+            stats.update(
+                UserStats.objects.filter(
+                    user_id__in=[item.user_id for item in missing]
+                ).in_bulk(field_name='user_id')
+            )
+            drifted = []
+            for pk, item in stats.items():
+                values = {
+                    field: actual[field].get(pk, 0) for field in fields
+                }
+                if any(getattr(item, f) != v for f, v in values.items()):
+                    for field, value in values.items():
+                        setattr(item, field, value)
+                    drifted.append(item)
+            UserStats.objects.bulk_update(drifted, fields)
+        fixed += len(drifted)
+    return fixed
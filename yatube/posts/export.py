@@ -0,0 +1,174 @@
+import csv
+import json
+import zipfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import Comment, Follow, Post
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'zip': 'application/zip',
+}
+# Поле записи -> столбец `.values()` для постов, комментариев и подписок.
+# Строки JSONL совпадают с форматом import_posts, поэтому выгрузку можно
+# загрузить обратно: комментарий ссылается на пост по его id в выгрузке.
+EXPORT_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+FOLLOW_FIELDS = {
+    'user': 'user__username',
+    'author': 'author__username',
+}
+# В CSV записи всех типов лежат в одной таблице со столбцом type.
+CSV_FIELDS = ['type', *dict.fromkeys(
+    [*EXPORT_FIELDS, *COMMENT_FIELDS, *FOLLOW_FIELDS]
+)]
+
+
+class StreamBuffer:
+    """Файл только для записи, из которого забирают накопленные байты.
+
+    ZipFile пишет в него без seek, а поток отдает записанное порциями.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = bytes(self.data)
+        self.data.clear()
+        return data
+
+
+class Echo:
+    """Строка, которую csv.writer пишет, сразу возвращается."""
+
+    def write(self, value):
+        return value
+
+
+def author_follows(user):
+    """Подписки автора и подписки на него."""
+    return Follow.objects.filter(Q(user=user) | Q(author=user))
+
+
+def export_records(queryset, follows=None, chunk_size=None):
+    """Посты, комментарии к ним и подписки по возрастанию id.
+
+    Каждая таблица читается из базы порциями по `chunk_size` строк.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    comments = Comment.objects.filter(post__in=queryset.values('id'))
+    if follows is None:
+        follows = Follow.objects.none()
+    for record_type, rows, fields in (
+        ('post', queryset, EXPORT_FIELDS),
+        ('comment', comments, COMMENT_FIELDS),
+        ('follow', follows, FOLLOW_FIELDS),
+    ):
+        for row in rows.order_by('id').values(
+            *fields.values()
+        ).iterator(chunk_size=chunk_size):
+            record = {'type': record_type}
+            record.update(
+                (field, row[column]) for field, column in fields.items()
+            )
+            yield record
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(
+            record, cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
+
+
+def csv_lines(records):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for record in records:
+        yield writer.writerow([
+            '' if record.get(field) is None else record[field]
+            for field in CSV_FIELDS
+        ])
+
+
+def export_lines(queryset, export_format, chunk_size=None, follows=None):
+    """Строки выгрузки в нужном формате; память не растет с объемом."""
+    lines = jsonl_lines if export_format == 'jsonl' else csv_lines
+    return lines(export_records(queryset, follows, chunk_size))
+
+
+def image_names(queryset, chunk_size=None):
+    """Имена картинок без повторов: одинаковые файлы хранятся один раз."""
+    return queryset.exclude(image='').order_by('image').values_list(
+        'image', flat=True
+    ).distinct().iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+
+
+def export_chunks(
+    queryset, export_format, images=False, chunk_size=None, follows=None
+):
+    """Байты выгрузки порциями; с `images` - zip с файлами картинок.
+
+    Архив собирается на лету: записанное сразу забирается из буфера,
+    и в памяти остается не больше одной порции строк или файла.
+    """
+    lines = export_lines(queryset, export_format, chunk_size, follows)
+    if not images:
+        for line in lines:
+            yield line.encode()
+        return
+    buffer = StreamBuffer()
+    limit = settings.EXPORT_STREAM_BUFFER
+    storage = Post._meta.get_field('image').storage
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        # Размер заранее неизвестен: zip64 снимает предел в 2 ГБ.
+        with archive.open(
+            f'posts.{export_format}', 'w', force_zip64=True
+        ) as entry:
+            for line in lines:
+                entry.write(line.encode())
+                if len(buffer.data) >= limit:
+                    yield buffer.drain()
+        for name in image_names(queryset, chunk_size):
+            if not storage.exists(name):
+                continue
+            # Картинки уже сжаты, повторно их не сжимаем.
+            info = zipfile.ZipInfo(name)
+            info.compress_type = zipfile.ZIP_STORED
+            with storage.open(name) as source, archive.open(
+                info, 'w', force_zip64=True
+            ) as entry:
+                for chunk in source.chunks():
+                    entry.write(chunk)
+                    if len(buffer.data) >= limit:
+                        yield buffer.drain()
+    yield buffer.drain()
+
+
+def export_filename(name, export_format, images=False):
+    return f'{name}.{"zip" if images else export_format}'
@@ -0,0 +1,185 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from core.paginator import CursorPaginator
+
+from .models import FeedItem, Follow, PopularAuthor, Post, UserStats
+from .utils import POST_ORDERING
+
+FEED_ORDERING = ('-pub_date', '-post_id')
+
+
+def is_popular(author_id):
+    return PopularAuthor.objects.filter(author_id=author_id).exists()
+
+
+def update_popularity(author_id):
+    """Переводит автора на чтение при показе, если подписчиков много.
+
+    Обратного перевода здесь нет: его делает `rebuild_feeds`, которая
+    заодно раскладывает по лентам посты бывшего популярного автора.
+    """
+    if is_popular(author_id):
+        return True
+    followers = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+    if followers < settings.FEED_FANOUT_LIMIT:
+        return False
+    PopularAuthor.objects.get_or_create(author_id=author_id)
+    return True
+
+
+def _bulk_insert(items):
+    """Сохраняет записи ленты пачками, пропуская уже существующие."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= settings.FEED_BATCH_SIZE:
+            FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    fan_out_posts([post])
+
+
+def fan_out_posts(posts):
+    """Раскладывает новые посты в ленты подписчиков их авторов.
+
+    Популярные авторы и подписчики читаются одним запросом на всю
+    пачку, а не на каждый пост.
+    """
+    by_author = {}
+    for post in posts:
+        by_author.setdefault(post.author_id, []).append(post)
+    popular = set(PopularAuthor.objects.filter(
+        author_id__in=by_author
+    ).values_list('author_id', flat=True))
+    followers = Follow.objects.filter(
+        author_id__in=by_author.keys() - popular
+    ).values_list('user_id', 'author_id')
+    _bulk_insert(
+        FeedItem(user_id=user_id, post_id=post.id, pub_date=post.pub_date)
+        for user_id, author_id in followers.iterator()
+        for post in by_author[author_id]
+    )
+
+
+def add_author_to_feed(user_id, author_id):
+    """Добавляет в ленту пользователя все посты нового автора."""
+    if update_popularity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )
+    _bulk_insert(
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def remove_author_from_feed(user_id, author_id):
+    """Убирает из ленты пользователя посты автора после отписки."""
+    FeedItem.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+@transaction.atomic
+def rebuild_feeds(user_ids=None):
+    """Пересобирает ленты заново по таблице подписок.
+
+    Полная пересборка заново определяет популярных авторов.
+    """
+    feed = FeedItem.objects.all()
+    posts = Post.objects.filter(author__following__isnull=False)
+    if user_ids is None:
+        PopularAuthor.objects.all().delete()
+        PopularAuthor.objects.bulk_create(
+            PopularAuthor(author_id=row['author_id'])
+            for row in Follow.objects.values('author_id').annotate(
+                followers=Count('id')
+            ).filter(followers__gte=settings.FEED_FANOUT_LIMIT)
+        )
+    else:
+        feed = feed.filter(user_id__in=user_ids)
+        posts = posts.filter(author__following__user_id__in=user_ids)
+    feed.delete()
+    rows = posts.filter(author__popular__isnull=True).values_list(
+        'id', 'pub_date', 'author__following__user_id'
+    )
+    _bulk_insert(
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date, user_id in rows.iterator(
+            chunk_size=settings.FEED_BATCH_SIZE
+        )
+    )
+
+
+class FeedPaginator(CursorPaginator):
+    """Лента подписок: разложенные посты плюс посты популярных авторов.
+
+    Входящие записи пользователя и посты каждого популярного автора
+    читаются отдельными отсортированными потоками по (pub_date, id)
+    и сливаются k-way слиянием, так что популярный автор не требует
+    записи в ленту каждого подписчика.
+    """
+    stream_class = CursorPaginator
+    numbered = False
+
+    def __init__(self, user, per_page):
+        super().__init__(self.inbox(user), per_page, FEED_ORDERING)
+        popular = Follow.objects.filter(
+            user=user, author__popular__isnull=False
+        ).values_list('author_id', flat=True)
+        self.streams = [
+            self.stream_class(
+                self.author_posts(author_id), per_page, POST_ORDERING
+            )
+            for author_id in popular
+        ]
+
+    def inbox(self, user):
+        return FeedItem.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        )
+
+    def author_posts(self, author_id):
+        return Post.objects.filter(author_id=author_id).select_related(
+            'author', 'group'
+        )
+
+    def unpack(self, item):
+        """Пост из записи входящей ленты."""
+        return item.post
+
+    def fetch(self, values, backwards, limit):
+        streams = [[
+            self.unpack(item)
+            for item in super().fetch(values, backwards, limit)
+        ]]
+        streams.extend(
+            stream.fetch(values, backwards, limit) for stream in self.streams
+        )
+        merged = heapq.merge(*streams, key=self.key, reverse=not backwards)
+        return list(islice(self.unique(merged), limit))
+
+    def unique(self, posts):
+        """Пропускает пост, попавший и в ленту, и в поток автора."""
+        last = None
+        for post in posts:
+            key = self.key(post)
+            if key != last:
+                yield post
+            last = key
+
+    def key(self, post):
+        return post.pub_date, post.id
@@ -0,0 +1,118 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.files import File
+from django.core.files.images import get_image_dimensions
+from PIL import Image, ImageOps
+
+from .models import Post
+
+# Форматы, в которых картинка сохраняется как есть; остальные - в PNG.
+KEPT_FORMATS = {
+    'JPEG': 'JPEG',
+    'MPO': 'JPEG',
+    'PNG': 'PNG',
+    'GIF': 'GIF',
+    'WEBP': 'WEBP',
+}
+JPEG_MODES = ('RGB', 'L', 'CMYK')
+# Сведения, от которых зависит вид картинки. Остальное (EXIF, XMP,
+# комментарии) отбрасывается: PNG Pillow пишет с EXIF из `info`.
+KEPT_INFO = ('transparency', 'icc_profile')
+
+
+def _spool():
+    """Буфер результата: в памяти до порога, дальше - временный файл."""
+    return tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+
+
+def process_upload(upload):
+    """Уменьшает загруженную картинку и убирает из нее метаданные.
+
+    Исходник читается с диска (загрузки туда пишет обработчик из
+    FILE_UPLOAD_HANDLERS). JPEG декодируется сразу в уменьшенном
+    масштабе через draft, так что память зависит от IMAGE_MAX_SIDE,
+    а не от размера снимка; для остальных форматов объем декодирования
+    ограничен проверкой IMAGE_MAX_PIXELS до чтения пикселей.
+    Ориентация из EXIF применяется к пикселям, EXIF не сохраняется
+    ни в одном формате.
+    """
+    max_side = settings.IMAGE_MAX_SIDE
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Слишком большое изображение: не больше %(limit)s пикселей.',
+                code='too_many_pixels',
+                params={'limit': settings.IMAGE_MAX_PIXELS},
+            )
+        if getattr(image, 'is_animated', False) and image.format != 'MPO':
+            # Анимацию не пережимаем, чтобы не потерять кадры. MPO с
+            # телефонов - снимок с превью в соседних кадрах: его
+            # пережимаем как JPEG, иначе уйдут EXIF и координаты.
+            upload.seek(0)
+            return File(upload, upload.name)
+        source_format = image.format
+        image.draft(None, (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        image.info = {
+            key: image.info[key] for key in KEPT_INFO if key in image.info
+        }
+        output_format = KEPT_FORMATS.get(source_format, 'PNG')
+        if output_format == 'JPEG' and image.mode not in JPEG_MODES:
+            image = image.convert('RGB')
+        name = upload.name
+        if output_format != KEPT_FORMATS.get(source_format):
+            name = os.path.splitext(name)[0] + '.png'
+        output = _spool()
+        options = {}
+        if output_format in ('JPEG', 'WEBP'):
+            options['quality'] = settings.IMAGE_QUALITY
+        if output_format == 'JPEG':
+            options.update(optimize=True, progressive=True)
+        image.save(output, output_format, **options)
+        output.seek(0)
+        return File(output, name)
+
+
+def read_dimensions(storage, name):
+    """Размеры картинки из хранилища; (None, None), если файла нет."""
+    try:
+        with storage.open(name) as image_file:
+            return get_image_dimensions(image_file)
+    except (OSError, SuspiciousFileOperation):
+        return None, None
+
+
+def backfill_dimensions(batch_size):
+    """Заполняет размеры картинок у старых постов пачками.
+
+    Каждый файл открывается один раз на пачку, даже если на него
+    ссылаются несколько постов. Возвращает число заполненных постов и
+    число постов, чьи файлы прочитать не удалось.
+    """
+    storage = Post._meta.get_field('image').storage
+    queryset = Post.objects.exclude(image='').filter(image_width__isnull=True)
+    filled = missing = last = 0
+    while True:
+        posts = list(queryset.filter(pk__gt=last).order_by('pk').only(
+            'pk', 'image'
+        )[:batch_size])
+        if not posts:
+            return filled, missing
+        last = posts[-1].pk
+        sizes = {}
+        for post in posts:
+            name = post.image.name
+            if name not in sizes:
+                sizes[name] = read_dimensions(storage, name)
+            post.image_width, post.image_height = sizes[name]
+        found = [post for post in posts if post.image_width]
+        Post.objects.bulk_update(found, ['image_width', 'image_height'])
+        filled += len(found)
+        missing += len(posts) - len(found)
@@ -0,0 +1,365 @@
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.cache import bump_generation
+
+from .authors import author_names
+from .caching import INDEX_NAMESPACE, invalidate_authors, invalidate_groups
+from . import counters, feeds
+from .models import (
+    AuthorName, Comment, Follow, Group, ImportCheckpoint, ImportedPost, Post,
+    User
+)
+
+# Сколько значений подставлять в один IN: у SQLite лимит переменных.
+LOOKUP_CHUNK = 500
+
+
+class SkipRecord(ValueError):
+    """Строку нельзя импортировать; аргумент - причина для отчета."""
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Отключает auto_now/auto_now_add: даты берутся из импорта."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def chunks(values, size=LOOKUP_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def parse_date(value):
+    if value is None:
+        return timezone.now()
+    date = parse_datetime(value) if isinstance(value, str) else None
+    if date is None:
+        raise SkipRecord('bad_date')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def required(record, name):
+    value = record.get(name)
+    if value in (None, ''):
+        raise SkipRecord(f'no_{name}')
+    return value
+
+
+class PostImporter:
+    """Импорт постов, комментариев и подписок из JSONL пачками.
+
+    Строки файла:
+
+        {"type": "post", "id": "p1", "author": "leo", "group": "slug",
+         "text": "...", "pub_date": "2020-01-01T10:00:00+03:00"}
+        {"type": "comment", "post": "p1", "author": "fyodor",
+         "text": "...", "created": "..."}
+        {"type": "follow", "user": "fyodor", "author": "leo"}
+
+    Авторы и группы ищутся по словарям в памяти, построенным одним
+    запросом. Каждая пачка пишется `bulk_create` в одной транзакции
+    вместе со смещением в файле, поэтому после обрыва импорт
+    продолжается с первой незаписанной строки. Счетчики и ленты
+    сдвигаются в той же транзакции только на записанное пачкой.
+
+    На SQLite `bulk_create` не возвращает id, а комментарии пачки
+    должны сослаться на ее посты, поэтому id назначаются здесь от
+    `Max('id')`. Чтобы пост, созданный на сайте во время импорта, не
+    занял тот же id, пачка сначала пишет смещение: так она берет
+    блокировку записи базы до чтения `Max('id')` и держит ее до конца
+    транзакции. Запись на сайте в это время ждет, а не падает.
+    """
+
+    def __init__(self, source, batch_size, create_authors=False):
+        self.source = source
+        self.batch_size = batch_size
+        self.create_authors = create_authors
+        self.authors = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.posts = {}
+        self.created = Counter()
+        self.skipped = Counter()
+        self.lines = 0
+        self.touched_authors = set()
+        self.touched_groups = set()
+
+    def run(self, path, progress=None):
+        """Импортирует файл с сохраненного места; `progress(importer)`
+        вызывается после каждой пачки."""
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            source=self.source
+        )
+        self.started = time.monotonic()
+        with open(path, 'rb') as file:
+            file.seek(checkpoint.offset)
+            offset = checkpoint.offset
+            batch = []
+            for line in file:
+                offset += len(line)
+                batch.append(line)
+                if len(batch) >= self.batch_size:
+                    self.write_batch(batch, checkpoint, offset)
+                    batch = []
+                    if progress:
+                        progress(self)
+            if batch:
+                self.write_batch(batch, checkpoint, offset)
+                if progress:
+                    progress(self)
+
+    @property
+    def rate(self):
+        """Строк в секунду с начала этого запуска."""
+        elapsed = time.monotonic() - self.started
+        return self.lines / elapsed if elapsed > 0 else 0.0
+
+    def parse(self, lines):
+        records = {'post': [], 'comment': [], 'follow': []}
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                records[record['type']].append(record)
+            except (ValueError, KeyError, TypeError):
+                self.skipped['bad_record'] += 1
+        return records
+
+    def write_batch(self, lines, checkpoint, offset):
+        records = self.parse(lines)
+        with transaction.atomic(), explicit_timestamps(
+            Post._meta.get_field('pub_date'),
+            Post._meta.get_field('updated'),
+            Comment._meta.get_field('created'),
+        ):
+            # Первая запись транзакции: дальше база заблокирована для
+            # других писателей, и id от Max('id') никто не перехватит.
+            checkpoint.save(update_fields=['updated'])
+            self.add_missing_authors(records)
+            posts = self.build_posts(records['post'])
+            Post.objects.bulk_create(posts.values())
+            ImportedPost.objects.bulk_create(
+                ImportedPost(
+                    source=self.source, external_id=external_id, post=post
+                )
+                for external_id, post in posts.items()
+            )
+            self.posts.update(
+                (external_id, post.pk) for external_id, post in posts.items()
+            )
+            comments = self.build_comments(records['comment'])
+            Comment.objects.bulk_create(comments)
+            follows = self.build_follows(records['follow'])
+            Follow.objects.bulk_create(follows)
+            self.update_counters(posts.values(), comments, follows)
+            self.update_feeds(posts.values(), follows)
+            checkpoint.offset = offset
+            checkpoint.lines += len(lines)
+            checkpoint.save()
+        self.created.update(
+            post=len(posts), comment=len(comments), follow=len(follows)
+        )
+        self.lines += len(lines)
+
+    def usernames(self, records):
+        for record in records['post'] + records['comment']:
+            yield record.get('author')
+        for record in records['follow']:
+            yield record.get('user')
+            yield record.get('author')
+
+    def add_missing_authors(self, records):
+        """Создает пользователей, которых нет в словаре, если разрешено."""
+        if not self.create_authors:
+            return
+        missing = {
+            name for name in self.usernames(records)
+            if isinstance(name, str) and name and name not in self.authors
+        }
+        if not missing:
+            return
+        User.objects.bulk_create(
+            User(username=name, password=make_password(None))
+            for name in missing
+        )
+        names = []
+        for chunk in chunks(missing):
+            for user in User.objects.filter(username__in=chunk):
+                self.authors[user.username] = user.pk
+                names.extend(author_names(user))
+        AuthorName.objects.bulk_create(names)
+        self.created['user'] += len(missing)
+
+    def author_id(self, record, field='author'):
+        author_id = self.authors.get(required(record, field))
+        if author_id is None:
+            raise SkipRecord(f'unknown_{field}')
+        return author_id
+
+    def next_post_id(self):
+        """Первый свободный id или None, если база сама вернет id."""
+        if connection.features.can_return_ids_from_bulk_insert:
+            return None
+        return (Post.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+    def build_posts(self, records):
+        """Несохраненные посты с заранее назначенными id по внешнему id."""
+        known = set()
+        external_ids = [record.get('id') for record in records]
+        for chunk in chunks({str(value) for value in external_ids if value}):
+            known.update(ImportedPost.objects.filter(
+                source=self.source, external_id__in=chunk
+            ).values_list('external_id', flat=True))
+        next_id = self.next_post_id()
+        posts = {}
+        for record in records:
+            try:
+                external_id = str(required(record, 'id'))
+                if external_id in known or external_id in posts:
+                    raise SkipRecord('duplicate')
+                group_id = None
+                if record.get('group'):
+                    group_id = self.groups.get(record['group'])
+                    if group_id is None:
+                        raise SkipRecord('unknown_group')
+                pub_date = parse_date(record.get('pub_date'))
+                post = Post(
+                    id=next_id,
+                    author_id=self.author_id(record),
+                    group_id=group_id,
+                    text=required(record, 'text'),
+                    pub_date=pub_date,
+                    updated=pub_date,
+                )
+            except SkipRecord as reason:
+                self.skipped[str(reason)] += 1
+                continue
+            posts[external_id] = post
+            if next_id is not None:
+                next_id += 1
+            self.touched_authors.add(post.author_id)
+            self.touched_groups.add(post.group_id)
+        return posts
+
+    def resolve_posts(self, records):
+        """Дополняет словарь постов внешними id из прошлых запусков."""
+        missing = {
+            str(record.get('post')) for record in records
+        } - self.posts.keys()
+        for chunk in chunks(missing):
+            self.posts.update(ImportedPost.objects.filter(
+                source=self.source, external_id__in=chunk
+            ).values_list('external_id', 'post_id'))
+
+    def build_comments(self, records):
+        comments = []
+        self.resolve_posts(records)
+        for record in records:
+            try:
+                post_id = self.posts.get(str(required(record, 'post')))
+                if post_id is None:
+                    raise SkipRecord('unknown_post')
+                comments.append(Comment(
+                    post_id=post_id,
+                    author_id=self.author_id(record),
+                    text=required(record, 'text'),
+                    created=parse_date(record.get('created')),
+                ))
+            except SkipRecord as reason:
+                self.skipped[str(reason)] += 1
+        return comments
+
+    def existing_follows(self, records):
+        """Пары (подписчик, автор) из строк, уже записанные в базу."""
+        pairs = {
+            (self.authors.get(record.get('user')),
+             self.authors.get(record.get('author')))
+            for record in records
+        }
+        users = {user_id for user_id, _ in pairs} - {None}
+        existing = set()
+        for chunk in chunks(users):
+            existing.update(Follow.objects.filter(
+                user_id__in=chunk
+            ).values_list('user_id', 'author_id'))
+        return existing & pairs
+
+    def build_follows(self, records):
+        """Новые подписки: повторы из базы и из файла пропускаются."""
+        follows = []
+        seen = self.existing_follows(records)
+        for record in records:
+            try:
+                user_id = self.author_id(record, 'user')
+                author_id = self.author_id(record)
+                if user_id == author_id:
+                    raise SkipRecord('self_follow')
+                if (user_id, author_id) in seen:
+                    raise SkipRecord('duplicate')
+            except SkipRecord as reason:
+                self.skipped[str(reason)] += 1
+                continue
+            seen.add((user_id, author_id))
+            follows.append(Follow(user_id=user_id, author_id=author_id))
+            self.touched_authors.update((user_id, author_id))
+        return follows
+
+    def update_counters(self, posts, comments, follows):
+        """Сдвигает счетчики так же, как сигналы при обычном сохранении."""
+        deltas = (
+            ('posts_count', Counter(post.author_id for post in posts)),
+            ('followers_count', Counter(
+                follow.author_id for follow in follows
+            )),
+            ('following_count', Counter(follow.user_id for follow in follows)),
+        )
+        for field, users in deltas:
+            for user_id, delta in users.items():
+                counters.bump_user(user_id, delta, field)
+        for post_id, delta in Counter(
+            comment.post_id for comment in comments
+        ).items():
+            counters.bump_comments(post_id, delta)
+
+    def update_feeds(self, posts, follows):
+        """Раскладывает в ленты только посты и подписки этой пачки.
+
+        Посты пачки уже записаны, поэтому новая подписка приносит их
+        вместе со старыми, а `ignore_conflicts` в `_bulk_insert`
+        пропускает записи, добавленные обоими путями.
+        """
+        for chunk in chunks(posts):
+            feeds.fan_out_posts(chunk)
+        for follow in follows:
+            feeds.add_author_to_feed(follow.user_id, follow.author_id)
+
+    def finalize(self):
+        """Сбрасывает страницы затронутых авторов и групп.
+
+        Счетчики и ленты уже сдвинуты по пачкам, поэтому здесь нет ни
+        полного пересчета, ни пересборки лент.
+        """
+        bump_generation(INDEX_NAMESPACE)
+        for chunk in chunks(self.touched_authors):
+            invalidate_authors(*chunk)
+        for chunk in chunks(self.touched_groups - {None}):
+            invalidate_groups(*chunk)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import backfill_dimensions
+
+
+class Command(BaseCommand):
+    help = 'Записывает размеры картинок постам, у которых их еще нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов обрабатывать за один запрос'
+        )
+
+    def handle(self, *args, **options):
+        filled, missing = backfill_dimensions(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Заполнено постов: {filled}, файлов не найдено: {missing}.'
+        ))
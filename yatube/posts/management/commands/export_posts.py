@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import FORMATS, author_follows, export_chunks
+from posts.models import Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты автора, группы или всего сайта с комментариями '
+        'и подписками в JSONL или CSV, по желанию - zip вместе с картинками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл, в который писать выгрузку')
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--author', help='Username автора')
+        source.add_argument('--group', help='Slug группы')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--images', action='store_true',
+            help='Собрать zip с выгрузкой и файлами картинок'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.all()
+        follows = Follow.objects.all()
+        if options['author']:
+            author = User.objects.filter(username=options['author']).first()
+            if author is None:
+                raise CommandError(f'Автор не найден: {options["author"]}')
+            queryset = queryset.filter(author=author)
+            follows = author_follows(author)
+        if options['group']:
+            group = Group.objects.filter(slug=options['group']).first()
+            if group is None:
+                raise CommandError(f'Группа не найдена: {options["group"]}')
+            queryset = queryset.filter(group=group)
+            # Подписки не относятся к группе и в ее выгрузку не попадают.
+            follows = None
+        size = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in export_chunks(
+                queryset, options['format'], options['images'],
+                options['chunk_size'], follows
+            ):
+                output.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано {size} байт в {options["output"]}.'
+        ))
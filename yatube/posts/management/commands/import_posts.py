@@ -0,0 +1,64 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import PostImporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты, комментарии и подписки из JSONL. '
+        'Прерванный импорт продолжается с места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL, по записи в строке')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.IMPORT_BATCH_SIZE,
+            help='Сколько строк писать за одну транзакцию'
+        )
+        parser.add_argument(
+            '--source',
+            help='Имя источника для продолжения; по умолчанию - имя файла'
+        )
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать неизвестных пользователей без пароля'
+        )
+        parser.add_argument(
+            '--no-finalize', action='store_true',
+            help='Не сбрасывать кэш страниц после импорта'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'Файл не найден: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        importer = PostImporter(
+            options['source'] or os.path.basename(path),
+            options['batch_size'],
+            create_authors=options['create_authors'],
+        )
+        importer.run(path, progress=self.progress)
+        if not options['no_finalize']:
+            importer.finalize()
+        created = importer.created
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {importer.lines}, {importer.rate:.0f} строк/с. '
+            f'Постов: {created["post"]}, комментариев: {created["comment"]}, '
+            f'подписок: {created["follow"]}, '
+            f'пользователей: {created["user"]}.'
+        ))
+        if importer.skipped:
+            self.stdout.write(self.style.WARNING('Пропущено: ' + ', '.join(
+                f'{reason} - {count}'
+                for reason, count in sorted(importer.skipped.items())
+            ) + '.'))
+
+    def progress(self, importer):
+        self.stdout.write(
+            f'{importer.lines} строк, {importer.rate:.0f} строк/с'
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.feeds import rebuild_feeds
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты нужно пересобрать (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(
+                username__in=options['usernames']
+            ).values_list('id', flat=True))
+        rebuild_feeds(user_ids)
+        self.stdout.write(self.style.SUCCESS('Ленты пересобраны.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import install_index
+
+
+class Command(BaseCommand):
+    help = 'Пересоздает триггеры поиска и перестраивает индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default='default',
+            help='База данных, в которой перестроить индекс'
+        )
+
+    def handle(self, *args, **options):
+        install_index(options['database'], rebuild=True)
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
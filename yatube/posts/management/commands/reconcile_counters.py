@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_posts, reconcile_users
+from posts.media import reconcile_media
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, комментариев, подписок и файлов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк пересчитывать за одну транзакцию'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = reconcile_posts(batch_size)
+        users = reconcile_users(batch_size)
+        media = reconcile_media(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено постов: {posts}, пользователей: {users}, '
+            f'файлов: {media}.'
+        ))
@@ -0,0 +1,54 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.thumbnails import process_jobs, retry_failed_jobs
+
+
+def run_worker(once):
+    """Цикл одного процесса: выполняет очередь и ждет новых задач."""
+    done = 0
+    while True:
+        done += process_jobs()
+        if once:
+            return done
+        time.sleep(settings.THUMBNAIL_POLL_INTERVAL)
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры картинок постов из очереди в фоне.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Сколько процессов обрабатывают очередь'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать накопившуюся очередь и завершиться'
+        )
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Вернуть в очередь задачи, исчерпавшие попытки'
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        once = options['once']
+        if options['retry_failed']:
+            retried = retry_failed_jobs()
+            self.stdout.write(f'Возвращено в очередь: {retried}.')
+        if processes == 1:
+            done = run_worker(once)
+        else:
+            # Соединения с БД не должны переходить в дочерние процессы.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(processes) as pool:
+                done = sum(pool.map(run_worker, [once] * processes))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}.'
+        ))
@@ -0,0 +1,111 @@
+import logging
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import F
+from sorl.thumbnail import delete as delete_with_thumbnails
+
+from .counters import _batches, _counts
+from .models import MediaFile, Post
+
+logger = logging.getLogger(__name__)
+
+
+def add_reference(name, content=None):
+    """Отмечает, что еще один пост ссылается на файл.
+
+    Файл проверяется после записи счетчика: удаление, начатое раньше,
+    к этому времени уже завершено (см. `delete_unreferenced`), и если
+    оно забрало файл, его содержимое `content` записывается заново.
+    """
+    if not name:
+        return
+    with transaction.atomic():
+        updated = MediaFile.objects.filter(name=name).update(
+            references=F('references') + 1
+        )
+        if not updated:
+            MediaFile.objects.get_or_create(name=name)
+            MediaFile.objects.filter(name=name).update(
+                references=F('references') + 1
+            )
+        storage = Post._meta.get_field('image').storage
+        try:
+            if content is not None:
+                storage.restore(name, content)
+            elif not storage.exists(name):
+                logger.error('Пост ссылается на отсутствующий файл %s', name)
+        except SuspiciousFileOperation:
+            # Имя вне MEDIA_ROOT: такой файл хранилище не ведет.
+            logger.warning('Файл вне хранилища: %s', name)
+
+
+def remove_reference(name):
+    """Снимает ссылку; файл без ссылок удаляется после фиксации."""
+    if not name:
+        return
+    MediaFile.objects.filter(name=name, references__gt=0).update(
+        references=F('references') - 1
+    )
+    transaction.on_commit(lambda: delete_unreferenced(name))
+
+
+def delete_unreferenced(name):
+    """Удаляет файл и его миниатюры, если ссылок на него не осталось.
+
+    Запись удаляется тем же запросом, что проверяет счетчик, а файл -
+    в той же транзакции. Новая ссылка (`add_reference`) ждет ее конца,
+    поэтому либо удаление видит ссылку и ничего не трогает, либо
+    ссылка видит, что файла нет, и записывает его заново.
+    """
+    with transaction.atomic():
+        deleted, _ = MediaFile.objects.filter(
+            name=name, references=0
+        ).delete()
+        if not deleted:
+            return False
+        try:
+            delete_with_thumbnails(name)
+        except Exception:
+            # Осиротевший файл не должен ронять запрос.
+            logger.exception('Не удалось удалить файл %s', name)
+    return True
+
+
+def reconcile_media(batch_size):
+    """Пересчитывает ссылки на файлы пачками; возвращает число исправлений.
+
+    Сначала сверяются существующие записи, затем создаются записи для
+    файлов постов, у которых их нет.
+    """
+    fixed = 0
+    for ids in _batches(MediaFile.objects.all(), batch_size):
+        with transaction.atomic():
+            media = list(MediaFile.objects.filter(pk__in=ids))
+            actual = _counts(
+                Post.objects.all(), 'image', [item.name for item in media]
+            )
+            drifted = [
+                item for item in media
+                if item.references != actual.get(item.name, 0)
+            ]
+            for item in drifted:
+                item.references = actual.get(item.name, 0)
+            MediaFile.objects.bulk_update(drifted, ['references'])
+        fixed += len(drifted)
+    posts = Post.objects.exclude(image='')
+    for ids in _batches(posts, batch_size):
+        with transaction.atomic():
+            names = set(posts.filter(pk__in=ids).values_list(
+                'image', flat=True
+            ))
+            names -= set(MediaFile.objects.filter(
+                name__in=names
+            ).values_list('name', flat=True))
+            actual = _counts(Post.objects.all(), 'image', names)
+            MediaFile.objects.bulk_create(
+                MediaFile(name=name, references=references)
+                for name, references in actual.items()
+            )
+        fixed += len(actual)
+    return fixed
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    """Раскладывает существующие посты по лентам подписчиков пачками."""
+    FeedItem = apps.get_model('posts', 'FeedItem')
+    Post = apps.get_model('posts', 'Post')
+    rows = Post.objects.filter(author__following__isnull=False).values_list(
+        'id', 'pub_date', 'author__following__user_id'
+    ).iterator(chunk_size=settings.FEED_BATCH_SIZE)
+    batch = []
+    for post_id, pub_date, user_id in rows:
+        batch.append(
+            FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        )
+        if len(batch) >= settings.FEED_BATCH_SIZE:
+            FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_auto_20221218_1703'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_feed_item'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
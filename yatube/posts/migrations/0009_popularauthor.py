@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def mark_popular_authors(apps, schema_editor):
+    """Отмечает популярных авторов и убирает их посты из лент."""
+    FeedItem = apps.get_model('posts', 'FeedItem')
+    Follow = apps.get_model('posts', 'Follow')
+    PopularAuthor = apps.get_model('posts', 'PopularAuthor')
+    authors = list(Follow.objects.order_by().values('author_id').annotate(
+        followers=models.Count('id')
+    ).filter(
+        followers__gte=settings.FEED_FANOUT_LIMIT
+    ).values_list('author_id', flat=True))
+    PopularAuthor.objects.bulk_create(
+        PopularAuthor(author_id=author_id) for author_id in authors
+    )
+    FeedItem.objects.filter(post__author_id__in=authors).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_feeditem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='popular', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(mark_popular_authors, migrations.RunPython.noop),
+    ]
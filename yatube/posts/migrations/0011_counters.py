@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    for post in Post.objects.annotate(
+        total=models.Count('comments')
+    ).filter(total__gt=0).iterator():
+        Post.objects.filter(pk=post.pk).update(comments_count=post.total)
+    UserStats.objects.bulk_create(
+        UserStats(
+            user_id=user.pk,
+            posts_count=user.posts.count(),
+            followers_count=user.following.count(),
+            following_count=user.follower.count(),
+        )
+        for user in User.objects.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=100, unique=True, verbose_name='Картинка')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='Взята в работу')),
+            ],
+            options={
+                'ordering': ['created'],
+            },
+        ),
+    ]
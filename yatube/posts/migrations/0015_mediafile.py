@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:31
+
+import core.storage
+from django.db import migrations, models
+
+
+def fill_references(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    MediaFile = apps.get_model('posts', 'MediaFile')
+    MediaFile.objects.bulk_create(
+        MediaFile(name=row['image'], references=row['total'])
+        for row in Post.objects.exclude(image='').values('image').annotate(
+            total=models.Count('pk')
+        ).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Файл')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_references, migrations.RunPython.noop),
+    ]
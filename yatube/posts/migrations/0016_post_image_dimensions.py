@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:36
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_mediafile'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, height_field='image_height', storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка', width_field='image_width'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='posts.Post')),
+                ('text', models.TextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+    ]
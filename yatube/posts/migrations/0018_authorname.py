@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_author_names(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorName = apps.get_model('posts', 'AuthorName')
+
+    def normalize(value):
+        return ' '.join(value.split()).casefold()
+
+    rows = []
+    for user in User.objects.iterator():
+        full_name = f'{user.first_name} {user.last_name}'.strip()
+        keys = {
+            normalize(value) for value in (
+                user.username, user.first_name, user.last_name, full_name
+            )
+        }
+        keys.discard('')
+        rows.extend(
+            AuthorName(
+                user_id=user.pk,
+                key=key,
+                username=user.username,
+                full_name=full_name,
+            )
+            for key in keys
+        )
+    AuthorName.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorName',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=301, verbose_name='Ключ поиска')),
+                ('username', models.CharField(max_length=150, verbose_name='Логин')),
+                ('full_name', models.CharField(blank=True, max_length=301, verbose_name='Полное имя')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_author_names, migrations.RunPython.noop),
+    ]
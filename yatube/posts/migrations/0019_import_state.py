@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_authorname'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='Источник')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='Смещение в файле')),
+                ('lines', models.PositiveIntegerField(default=0, verbose_name='Обработано строк')),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportedPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, verbose_name='Источник')),
+                ('external_id', models.CharField(max_length=255, verbose_name='Id в источнике')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='importedpost',
+            constraint=models.UniqueConstraint(fields=('source', 'external_id'), name='unique_imported_post'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_import_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Неудачных попыток'),
+        ),
+    ]
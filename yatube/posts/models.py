@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.signals import post_init
+
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -21,6 +24,7 @@ class Post(models.Model):
         help_text='Текст вашего поста'
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -36,16 +40,82 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
+        width_field='image_width',
+        height_field='image_height',
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        verbose_name='Ширина картинки',
+        blank=True, null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        verbose_name='Высота картинки',
+        blank=True, null=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Число комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+# ImageField с width_field заполняет пустые размеры при создании каждого
+# объекта, открывая файл, - то есть прямо при рендере ленты. Размеры и так
+# пишутся при назначении картинки, а старые строки заполняет команда
+# backfill_image_sizes, поэтому чтение при загрузке из БД отключено.
+post_init.disconnect(
+    Post._meta.get_field('image').update_dimension_fields, sender=Post
+)
+
+
+class SearchTextField(models.TextField):
+    """Столбец индекса FTS5: только у него есть поиск `__match`."""
+
+
+class PostSearch(models.Model):
+    """Строка полнотекстового индекса FTS5 по тексту постов.
+
+    Таблицу и триггеры, которые держат ее в согласии с постами, создает
+    `posts.search.install_index`; здесь она описана только для чтения.
+    """
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        db_column='rowid',
+        on_delete=models.DO_NOTHING,
+        related_name='+'
+    )
+    text = SearchTextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -63,6 +133,12 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(
+            fields=['post', 'created', 'id'],
+            name='comment_post_created_idx'
+        )]
+
     def __str__(self):
         return self.text[:15]
 
@@ -84,3 +160,167 @@ class Follow(models.Model):
             fields=['user', 'author'],
             name='unique_follow'
         )]
+        indexes = [models.Index(
+            fields=['author', 'user'],
+            name='follow_author_user_idx'
+        )]
+
+
+class FeedItem(models.Model):
+    """Запись ленты подписок пользователя (fan-out on write)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_items'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'],
+            name='unique_feed_item'
+        )]
+        indexes = [models.Index(
+            fields=['user', '-pub_date', '-post'],
+            name='feed_user_pub_date_idx'
+        )]
+
+
+class PopularAuthor(models.Model):
+    """Автор, чьи посты не раскладываются по лентам, а читаются при показе."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='popular'
+    )
+
+
+class UserStats(models.Model):
+    """Счетчики пользователя, обновляемые при изменении постов и подписок."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Число постов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Число подписок',
+        default=0
+    )
+
+
+class AuthorName(models.Model):
+    """Ключ поиска автора по началу имени: логин, имя, фамилия.
+
+    Ключи хранятся в нижнем регистре, так что поиск по префиксу - это
+    диапазон по индексу, а не LIKE по всей таблице пользователей.
+    Логин и полное имя продублированы, чтобы ответ собирался из одной
+    таблицы.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    key = models.CharField(
+        verbose_name='Ключ поиска',
+        max_length=301,
+        db_index=True
+    )
+    username = models.CharField(
+        verbose_name='Логин',
+        max_length=150
+    )
+    full_name = models.CharField(
+        verbose_name='Полное имя',
+        max_length=301,
+        blank=True
+    )
+
+
+class ThumbnailJob(models.Model):
+    """Картинка, для которой фоновый обработчик должен создать миниатюры."""
+    image = models.CharField(
+        verbose_name='Картинка',
+        max_length=100,
+        unique=True
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(
+        verbose_name='Взята в работу',
+        blank=True, null=True
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Неудачных попыток',
+        default=0
+    )
+
+    class Meta:
+        ordering = ['created']
+
+
+class MediaFile(models.Model):
+    """Файл картинки и число постов, которые на него ссылаются."""
+    name = models.CharField(
+        verbose_name='Файл',
+        max_length=100,
+        unique=True
+    )
+    references = models.PositiveIntegerField(
+        verbose_name='Число ссылок',
+        default=0
+    )
+
+
+class ImportCheckpoint(models.Model):
+    """Докуда импортирован файл: продолжение после обрыва `import_posts`."""
+    source = models.CharField(
+        verbose_name='Источник',
+        max_length=255,
+        unique=True
+    )
+    offset = models.BigIntegerField(
+        verbose_name='Смещение в файле',
+        default=0
+    )
+    lines = models.PositiveIntegerField(
+        verbose_name='Обработано строк',
+        default=0
+    )
+    updated = models.DateTimeField(auto_now=True)
+
+
+class ImportedPost(models.Model):
+    """Пост, созданный импортом, и его id в исходной системе."""
+    source = models.CharField(
+        verbose_name='Источник',
+        max_length=255
+    )
+    external_id = models.CharField(
+        verbose_name='Id в источнике',
+        max_length=255
+    )
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['source', 'external_id'],
+            name='unique_imported_post'
+        )]
@@ -0,0 +1,124 @@
+import re
+
+from django.db import connections
+from django.db.models import Lookup
+from django.db.models.expressions import RawSQL
+
+from core.paginator import CursorPaginator
+
+from .models import PostSearch, SearchTextField
+
+# Сколько слов запроса учитывается; остальные отбрасываются.
+MAX_QUERY_TERMS = 10
+SEARCH_ORDERING = ('rank', 'post_id')
+
+INDEX_SQL = [
+    # Внешнее содержимое: индекс хранит только словарь, текст - в постах.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert "
+    "AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete "
+    "AFTER DELETE ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS posts_post_fts_update "
+    "AFTER UPDATE OF text ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+]
+TRIGGERS = (
+    'posts_post_fts_insert', 'posts_post_fts_delete', 'posts_post_fts_update'
+)
+
+
+@SearchTextField.register_lookup
+class Match(Lookup):
+    """`field__match=query` - условие FTS5 MATCH по столбцу индекса."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+def install_index(using='default', rebuild=False):
+    """Создает индекс и триггеры, если их нет; возвращает, был ли ремонт.
+
+    Изменение таблицы постов в миграциях SQLite пересоздает таблицу и
+    теряет ее триггеры, поэтому проверка выполняется после каждого
+    migrate. Если чего-то не хватало, индекс перестраивается целиком.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'posts_post_fts' "
+            "OR (type = 'trigger' AND name IN (%s, %s, %s))",
+            TRIGGERS
+        )
+        rebuild = rebuild or len(cursor.fetchall()) < len(TRIGGERS) + 1
+        if rebuild:
+            for statement in INDEX_SQL:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')"
+            )
+    return rebuild
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5 или пустая строка.
+
+    Берутся только слова, каждое ищется как префикс: стеммера для
+    русского в SQLite нет, а префикс находит другие формы слова.
+    """
+    terms = re.findall(r'\w+', query)[:MAX_QUERY_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_index(query):
+    """Строки индекса, подходящие под запрос; пустой запрос - ничего."""
+    expression = match_expression(query)
+    if not expression:
+        return PostSearch.objects.none()
+    return PostSearch.objects.filter(text__match=expression)
+
+
+def matching_posts(queryset, query):
+    """Сужает queryset постов до найденных по индексу."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        'SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s',
+        (expression,)
+    ))
+
+
+class SearchPaginator(CursorPaginator):
+    """Результаты поиска по релевантности с постраничным выводом по ключу.
+
+    Ключ страницы - (rank, id): rank из FTS5 тем меньше, чем выше
+    релевантность, а id разводит посты с одинаковым rank.
+    """
+    numbered = False
+
+    def __init__(self, query, per_page):
+        rows = search_index(query).select_related(
+            'post__author', 'post__group'
+        ).order_by(*SEARCH_ORDERING)
+        super().__init__(rows, per_page, SEARCH_ORDERING)
+
+    def get_cursor_page(self, cursor):
+        page = super().get_cursor_page(cursor)
+        page.object_list = [row.post for row in page.object_list]
+        return page
@@ -0,0 +1,153 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from core.cache import bump_generation
+
+from . import authors, counters, feeds, media, thumbnails
+from .caching import (
+    group_author_ids, group_namespace, invalidate_author_name,
+    invalidate_authors, invalidate_group_name, invalidate_post,
+    post_namespace
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+NAME_FIELDS = sorted(authors.NAME_FIELDS)
+
+
+def _skips_names(raw, update_fields):
+    """Сохранение не меняет имен: загрузка фикстур или вход на сайт."""
+    return raw or (update_fields and not authors.NAME_FIELDS & update_fields)
+
+
+@receiver(pre_save, sender=User)
+def user_renaming(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Запоминает прежние логин и имя пользователя."""
+    if instance.pk and not _skips_names(raw, update_fields):
+        instance._old_names = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Обновляет ключи поиска и сбрасывает страницы с прежним именем."""
+    if _skips_names(raw, update_fields):
+        return
+    old_names = getattr(instance, '_old_names', None)
+    if old_names == tuple(getattr(instance, name) for name in NAME_FIELDS):
+        return
+    authors.index_author(instance)
+    if old_names is not None:
+        invalidate_author_name(
+            instance.pk,
+            dict(zip(NAME_FIELDS, old_names))['username'],
+            instance.username
+        )
+
+
+@receiver(pre_save, sender=Group)
+def group_renaming(sender, instance, raw=False, **kwargs):
+    """Запоминает прежний адрес группы."""
+    instance._old_slug = None
+    if instance.pk and not raw:
+        instance._old_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        bump_generation(group_namespace(instance.slug))
+        return
+    invalidate_group_name(
+        instance.pk, [instance._old_slug, instance.slug],
+        group_author_ids(instance.pk)
+    )
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    """Запоминает авторов постов группы до того, как посты ее потеряют."""
+    instance._author_ids = group_author_ids(instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    """Посты теряют группу UPDATE без сигналов: страницы сбрасываются здесь."""
+    invalidate_group_name(
+        instance.pk, [instance.slug], getattr(instance, '_author_ids', [])
+    )
+
+
+@receiver(pre_save, sender=Post)
+def post_moving(sender, instance, raw=False, **kwargs):
+    """Запоминает прежние группу и картинку и содержимое новой картинки."""
+    if raw:
+        return
+    instance._image_content = None
+    if instance.image and not instance.image._committed:
+        instance._image_content = instance.image.file
+    if instance.pk:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    invalidate_post(instance, getattr(instance, '_old_group_id', None))
+    if raw:
+        return
+    old_image = getattr(instance, '_old_image', None)
+    if instance.image.name != old_image:
+        thumbnails.schedule_thumbnails(instance.image.name)
+        media.add_reference(instance.image.name, instance._image_content)
+        media.remove_reference(old_image)
+    if created:
+        counters.post_added(instance)
+        feeds.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    invalidate_post(instance)
+    counters.post_removed(instance)
+    media.remove_reference(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_comments(instance.post_id, 1)
+        bump_generation(post_namespace(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    bump_generation(post_namespace(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.follow_added(instance)
+        invalidate_authors(instance.user_id, instance.author_id)
+        feeds.add_author_to_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_removed(instance)
+    invalidate_authors(instance.user_id, instance.author_id)
+    feeds.remove_author_from_feed(instance.user_id, instance.author_id)
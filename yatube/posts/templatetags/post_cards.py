@@ -0,0 +1,66 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core.cache import get_generations
+
+from ..caching import author_name_namespace, group_name_namespace
+from ..thumbnails import prefetch_thumbnails
+
+register = template.Library()
+
+
+def card_key(post, author_version, group_version, show_author, show_group):
+    return 'post_card:{}:{}:{}:{}:{:d}{:d}'.format(
+        post.pk, post.updated.timestamp(), author_version, group_version,
+        show_author, show_group
+    )
+
+
+@register.simple_tag
+def post_cards(posts, show_author=True, show_group=True):
+    """Готовые карточки постов страницы из кэша.
+
+    Карточки читаются одним `get_many`; шаблон рендерится только для
+    постов, которых нет в кэше. Ключ включает время правки поста и
+    поколения имени автора и названия группы, если карточка их
+    показывает.
+    Миниатюры для рендера загружаются разом для всех таких постов.
+    """
+    posts = list(posts)
+    authors = [
+        author_name_namespace(post.author_id) if show_author else None
+        for post in posts
+    ]
+    groups = [
+        group_name_namespace(post.group_id)
+        if show_group and post.group_id else None
+        for post in posts
+    ]
+    namespaces = [name for name in authors + groups if name]
+    versions = dict(zip(namespaces, get_generations(namespaces)))
+    keys = [
+        card_key(
+            post, versions.get(author, 0), versions.get(group, 0),
+            show_author, show_group
+        )
+        for post, author, group in zip(posts, authors, groups)
+    ]
+    cards = cache.get_many(keys)
+    missing = {}
+    card_template = get_template('includes/post_card.html')
+    prefetch_thumbnails(
+        post for post, key in zip(posts, keys) if key not in cards
+    )
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            missing[key] = cards[key] = card_template.render({
+                'post': post,
+                'show_author': show_author,
+                'show_group': show_group,
+            })
+    if missing:
+        cache.set_many(missing, settings.PAGE_CACHE_TIMEOUT)
+    return [mark_safe(cards[key]) for key in keys]
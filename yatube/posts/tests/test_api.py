@@ -0,0 +1,237 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import (
+    Comment, FeedItem, Follow, Group, PopularAuthor, Post
+)
+from ..thumbnails import built_thumbnail, generate_thumbnails
+from .test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        PopularAuthor.objects.create(author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        with mock.patch('posts.thumbnails.schedule_thumbnails'):
+            for i in range(settings.POSTS_PER_PAGE + 3):
+                Post.objects.create(
+                    author=cls.star if i % 3 == 0 else cls.author,
+                    group=cls.group if i % 2 else None,
+                    text=f'Пост {i}',
+                )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        patcher = mock.patch('posts.thumbnails.schedule_thumbnails')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        cache.clear()
+
+    def collect(self, url, **params):
+        """Все страницы ленты по курсорам: список id."""
+        ids = []
+        cursor = None
+        while True:
+            query = dict(params, fields='id')
+            if cursor:
+                query['cursor'] = cursor
+            data = self.client.get(url, query).json()
+            ids.extend(item['id'] for item in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids
+
+    def expected(self, queryset):
+        return list(queryset.order_by('-pub_date', '-id').values_list(
+            'id', flat=True
+        ))
+
+    def test_feeds_match_html_order(self):
+        """Ленты API совпадают с лентами сайта при листании курсором."""
+        self.client.force_login(self.reader)
+        feeds = {
+            reverse('posts:api_index'): Post.objects.all(),
+            reverse('posts:api_group_posts', args=['group']):
+                Post.objects.filter(group=self.group),
+            reverse('posts:api_profile', args=['author']):
+                Post.objects.filter(author=self.author),
+            reverse('posts:api_follow_index'): Post.objects.all(),
+        }
+        for url, queryset in feeds.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.collect(url), self.expected(queryset))
+
+    def test_follow_feed_merges_inbox_and_popular(self):
+        """Лента подписок сливает разложенные посты и популярных авторов."""
+        self.assertFalse(
+            FeedItem.objects.filter(post__author=self.star).exists()
+        )
+        self.client.force_login(self.reader)
+        self.assertEqual(
+            self.collect(reverse('posts:api_follow_index')),
+            self.expected(Post.objects.all())
+        )
+
+    def test_sparse_fields(self):
+        """`?fields=` оставляет в ответе только перечисленные поля."""
+        data = self.client.get(
+            reverse('posts:api_index'), {'fields': 'text,author'}
+        ).json()
+        self.assertEqual(
+            data['results'][0], {'text': 'Пост 12', 'author': 'star'}
+        )
+
+    def test_unknown_field(self):
+        """Неизвестное поле - ошибка 400 в JSON."""
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_comment_counts_are_not_cached_in_feeds(self):
+        """Счетчик комментариев есть только в ответе о посте.
+
+        Ленты кэшируются без учета комментариев, поэтому счетчик в них
+        устарел бы; в ответе о посте он обновляется сразу.
+        """
+        urls = [
+            reverse('posts:api_index'),
+            reverse('posts:api_group_posts', args=['group']),
+            reverse('posts:api_profile', args=['author']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotIn(
+                    'comments_count', self.client.get(url).json()['results'][0]
+                )
+                response = self.client.get(url, {'fields': 'comments_count'})
+                self.assertEqual(response.status_code, 400)
+        post = Post.objects.first()
+        url = reverse('posts:api_post_detail', args=[post.pk])
+        self.assertEqual(self.client.get(url).json()['comments_count'], 0)
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        self.assertEqual(self.client.get(url).json()['comments_count'], 1)
+
+    def test_models_are_not_instantiated(self):
+        """Ответ строится из строк `.values()`, без создания моделей."""
+        self.client.force_login(self.reader)
+        post = Post.objects.first()
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        urls = [
+            reverse('posts:api_index'),
+            reverse('posts:api_follow_index'),
+            reverse('posts:api_post_detail', args=[post.pk]),
+            reverse('posts:api_post_comments', args=[post.pk]),
+        ]
+        with mock.patch.object(
+            Post, '__init__', side_effect=AssertionError
+        ), mock.patch.object(
+            Comment, '__init__', side_effect=AssertionError
+        ), mock.patch.object(
+            FeedItem, '__init__', side_effect=AssertionError
+        ):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_missing_objects(self):
+        """Несуществующие группа, автор и пост - 404 в JSON."""
+        urls = [
+            reverse('posts:api_group_posts', args=['nope']),
+            reverse('posts:api_profile', args=['nobody']),
+            reverse('posts:api_post_detail', args=[999]),
+            reverse('posts:api_post_comments', args=[999]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def test_follow_feed_needs_login(self):
+        """Лента подписок без входа - 401."""
+        response = self.client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_post_detail_and_comments(self):
+        """Пост и его комментарии с курсором."""
+        post = Post.objects.first()
+        for i in range(settings.COMMENTS_PER_PAGE + 1):
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'Комментарий {i}'
+            )
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=[post.pk]),
+            {'fields': 'id,author,comments_count'}
+        ).json()
+        self.assertEqual(data, {
+            'id': post.pk,
+            'author': post.author.username,
+            'comments_count': settings.COMMENTS_PER_PAGE + 1,
+        })
+        url = reverse('posts:api_post_comments', args=[post.pk])
+        first = self.client.get(url).json()
+        self.assertEqual(
+            len(first['results']), settings.COMMENTS_PER_PAGE
+        )
+        self.assertEqual(
+            set(first['results'][0]), {'id', 'text', 'created', 'author'}
+        )
+        rest = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        self.assertEqual(
+            [item['text'] for item in rest['results']],
+            [f'Комментарий {settings.COMMENTS_PER_PAGE}']
+        )
+
+    def test_thumbnail_urls(self):
+        """У поста с готовой миниатюрой в ответе ее адрес и srcset."""
+        post = Post.objects.first()
+        post.image = SimpleUploadedFile(
+            'small.gif', SMALL_GIF, content_type='image/gif'
+        )
+        post.save()
+        generate_thumbnails(post.image.name)
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=[post.pk]),
+            {'fields': 'image,thumbnail'}
+        ).json()
+        thumbnail = built_thumbnail(post.image.name, 'card')
+        self.assertEqual(data['image'], post.image.url)
+        self.assertEqual(data['thumbnail']['url'], thumbnail.url)
+        self.assertEqual(data['thumbnail']['width'], 960)
+        self.assertIn('480w', data['thumbnail']['srcset'])
+        other = self.client.get(
+            reverse('posts:api_index'), {'fields': 'thumbnail'}
+        ).json()['results']
+        self.assertIn({'thumbnail': None}, other)
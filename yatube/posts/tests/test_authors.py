@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..authors import autocomplete
+
+User = get_user_model()
+
+
+class AuthorAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.leo = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        User.objects.create_user(
+            username='fyodor', first_name='Фёдор', last_name='Достоевский'
+        )
+        User.objects.create_user(username='leonid')
+
+    def usernames(self, query, limit=10):
+        return [item['username'] for item in autocomplete(query, limit)]
+
+    def test_matches_username_and_names(self):
+        """Автор находится по началу логина, имени, фамилии и полного имени."""
+        self.assertEqual(self.usernames('LEO'), ['leo', 'leonid'])
+        self.assertEqual(self.usernames('лев'), ['leo'])
+        self.assertEqual(self.usernames('толст'), ['leo'])
+        self.assertEqual(self.usernames('  лев   тол'), ['leo'])
+        self.assertEqual(self.usernames('лев д'), [])
+        self.assertEqual(self.usernames(''), [])
+
+    def test_author_is_listed_once(self):
+        """Автор, подходящий по нескольким ключам, выводится один раз."""
+        User.objects.create_user(
+            username='lenka', first_name='Lena', last_name='Lenina'
+        )
+        self.assertEqual(self.usernames('len'), ['lenka'])
+
+    def test_keys_follow_renames(self):
+        """После смены имени старое больше не находится."""
+        self.leo.first_name = 'Николай'
+        self.leo.save()
+        self.assertEqual(self.usernames('лев'), [])
+        self.assertEqual(self.usernames('никол'), ['leo'])
+
+    def test_limit(self):
+        """Выводится не больше `limit` авторов."""
+        self.assertEqual(self.usernames('leo', limit=1), ['leo'])
+
+    def test_prefix_query_uses_index(self):
+        """Поиск читает диапазон индекса одним запросом."""
+        with CaptureQueriesContext(connection) as context:
+            autocomplete('leo', 10)
+        self.assertEqual(len(context.captured_queries), 1)
+        sql = context.captured_queries[0]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_endpoint_returns_profile_urls(self):
+        """Ответ - компактный JSON со ссылками на профили."""
+        response = Client().get(
+            reverse('posts:author_autocomplete'), {'q': 'Лев'}
+        )
+        self.assertEqual(response.json(), {'results': [{
+            'username': 'leo',
+            'name': 'Лев Толстой',
+            'url': reverse('posts:profile', args=['leo']),
+        }]})
+        self.assertIn('Лев'.encode(), response.content)
+        self.assertIn('max-age=', response['Cache-Control'])
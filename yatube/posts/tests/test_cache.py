@@ -0,0 +1,335 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from core.cache import bump_generation
+
+from ..caching import INDEX_NAMESPACE
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class IndexCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(author=self.user, text='Старый текст')
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_index(self):
+        return self.guest_client.get(reverse('posts:index')).content.decode()
+
+    def test_index_is_cached(self):
+        """Главная страница отдается из кэша, пока посты не менялись."""
+        self.get_index()
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        self.assertIn('Старый текст', self.get_index())
+
+    def test_post_changes_invalidate_index(self):
+        """Создание, правка и удаление поста сразу видны на главной."""
+        self.get_index()
+        new_post = Post.objects.create(author=self.user, text='Новый пост')
+        self.assertIn('Новый пост', self.get_index())
+        new_post.text = 'Исправленный пост'
+        new_post.save()
+        self.assertIn('Исправленный пост', self.get_index())
+        new_post.delete()
+        self.assertNotIn('Исправленный пост', self.get_index())
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            author=self.user, text='Старый текст', group=self.group
+        )
+        self.urls = {
+            'group': reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            'profile': reverse('posts:profile', kwargs={'username': 'auth'}),
+            'post': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}
+            ),
+        }
+
+    def tearDown(self):
+        cache.clear()
+
+    def get(self, name):
+        return self.guest_client.get(self.urls[name]).content.decode()
+
+    def test_pages_are_cached(self):
+        """Страницы группы, профиля и поста отдаются из кэша."""
+        for name in self.urls:
+            self.get(name)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        for name in self.urls:
+            with self.subTest(page=name):
+                self.assertIn('Старый текст', self.get(name))
+
+    def test_post_edit_invalidates_pages(self):
+        """Правка поста сбрасывает страницы группы, профиля и поста."""
+        for name in self.urls:
+            self.get(name)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for name in self.urls:
+            with self.subTest(page=name):
+                self.assertIn('Новый текст', self.get(name))
+
+    def test_moving_post_invalidates_old_group(self):
+        """Перенос поста в другую группу сбрасывает страницу прежней."""
+        self.assertIn('Старый текст', self.get('group'))
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertNotIn('Старый текст', self.get('group'))
+
+    def test_group_rename_invalidates_pages(self):
+        """Смена адреса и названия группы видна на страницах группы и поста."""
+        self.get('group')
+        self.get('post')
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.title = 'Новое название'
+        group.save()
+        self.assertEqual(
+            self.guest_client.get(self.urls['group']).status_code, 404
+        )
+        self.assertIn('Новое название', self.get('post'))
+        self.assertIn('/group/renamed/', self.get('post'))
+
+    def test_comment_invalidates_post_page(self):
+        """Новый комментарий сразу виден на странице поста."""
+        self.get('post')
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Свежий коммент'
+        )
+        self.assertIn('Свежий коммент', self.get('post'))
+
+    def test_follow_invalidates_profile(self):
+        """Подписка сбрасывает кэш профиля автора."""
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        url = self.urls['profile']
+        self.assertFalse(reader_client.get(url).context['following'])
+        reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'auth'})
+        )
+        self.assertTrue(reader_client.get(url).context['following'])
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(author=self.user, text='Старый текст')
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_index(self):
+        return self.guest_client.get(reverse('posts:index')).content.decode()
+
+    def test_card_is_reused_between_pages(self):
+        """Карточка поста берется из кэша, пока пост не изменен."""
+        self.get_index()
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        bump_generation(INDEX_NAMESPACE)
+        self.assertIn('Старый текст', self.get_index())
+        profile = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'auth'})
+        )
+        self.assertIn('Тихая правка', profile.content.decode())
+
+    def test_edited_post_gets_new_card(self):
+        """После правки поста карточка рендерится заново."""
+        self.get_index()
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertIn('Новый текст', self.get_index())
+
+    def test_renamed_author_gets_new_cards(self):
+        """Смена имени автора сбрасывает страницы и его карточки."""
+        profile_url = reverse('posts:profile', kwargs={'username': 'auth'})
+        self.get_index()
+        self.guest_client.get(profile_url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Лев'
+        user.save()
+        self.assertIn('Лев', self.get_index())
+        bump_generation(INDEX_NAMESPACE)
+        self.assertIn('Лев', self.get_index())
+        self.assertIn(
+            'Лев', self.guest_client.get(profile_url).content.decode()
+        )
+
+    def test_group_changes_reach_cards(self):
+        """Смена адреса и удаление группы меняют ссылку на карточках."""
+        group = Group.objects.create(
+            title='Группа', slug='old', description='Описание'
+        )
+        self.post.group = group
+        self.post.save()
+        profile_url = reverse('posts:profile', kwargs={'username': 'auth'})
+        pages = {
+            'index': self.get_index,
+            'profile': lambda: self.guest_client.get(
+                profile_url
+            ).content.decode(),
+        }
+        for page in pages.values():
+            self.assertIn('/group/old/', page())
+        group.slug = 'new'
+        group.save()
+        for name, page in pages.items():
+            with self.subTest(page=name):
+                content = page()
+                self.assertNotIn('/group/old/', content)
+                self.assertIn('/group/new/', content)
+        group.delete()
+        for name, page in pages.items():
+            with self.subTest(page=name):
+                self.assertNotIn('/group/new/', page())
+
+    def test_login_keeps_cards(self):
+        """Вход на сайт не сбрасывает карточки автора."""
+        self.get_index()
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        self.guest_client.force_login(self.user)
+        self.guest_client.logout()
+        bump_generation(INDEX_NAMESPACE)
+        self.assertIn('Старый текст', self.get_index())
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304 без тела."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_changes_produce_new_etag(self):
+        """После правки поста страницы отдаются целиком с новым ETag."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_user(self):
+        """Гость и авторизованный пользователь получают разные ETag."""
+        url = self.urls[0]
+        etag = self.guest_client.get(url)['ETag']
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_csrf_token_changes_etag(self):
+        """После повторного входа страница с формой приходит заново."""
+        self.user.set_password('pass')
+        self.user.save()
+        client = Client()
+        client.post(
+            reverse('users:login'), {'username': 'auth', 'password': 'pass'}
+        )
+        url = self.urls[-1]
+        response = client.get(url)
+        self.assertIn('csrfmiddlewaretoken', response.content.decode())
+        etag = response['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        client.get(reverse('users:logout'))
+        client.post(
+            reverse('users:login'), {'username': 'auth', 'password': 'pass'}
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_has_no_last_modified(self):
+        """Страница поста проверяется только по ETag, без Last-Modified."""
+        url = self.urls[-1]
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Удаляемый коммент'
+        )
+        response = self.guest_client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        since = http_date(time.time() + 60)
+        comment.delete()
+        response = self.guest_client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Удаляемый коммент', response.content.decode())
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
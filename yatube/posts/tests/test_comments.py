@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{i}') for i in range(3)
+        ]
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.readers[i % 3],
+                text=f'Комментарий {i}'
+            )
+            for i in range(12)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+        self.fragment_url = reverse(
+            'posts:post_comments', kwargs={'post_id': self.post.id}
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def test_first_screen_is_one_page(self):
+        """Страница поста показывает первую порцию, старые сверху."""
+        response = self.client.get(self.detail_url)
+        page = response.context['comments']
+        self.assertEqual(
+            self.texts(page), [f'Комментарий {i}' for i in range(5)]
+        )
+        self.assertContains(response, page.next_cursor)
+
+    def test_fragment_loads_rest(self):
+        """Фрагменты по курсору отдают остальные комментарии без повторов."""
+        cursor = self.client.get(self.detail_url).context[
+            'comments'
+        ].next_cursor
+        texts = []
+        while cursor:
+            response = self.client.get(self.fragment_url, {'cursor': cursor})
+            self.assertNotContains(response, '<html')
+            page = response.context['comments']
+            texts.extend(self.texts(page))
+            cursor = page.next_cursor
+        self.assertEqual(texts, [f'Комментарий {i}' for i in range(5, 12)])
+
+    def test_queries_do_not_grow_with_comments(self):
+        """Число запросов не зависит от числа комментариев и авторов."""
+        def count_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(self.detail_url)
+            return len(context.captured_queries)
+
+        before = count_queries()
+        for i in range(settings.COMMENTS_PER_PAGE):
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create_user(username=f'new{i}'),
+                text='Еще комментарий',
+            )
+        self.assertEqual(count_queries(), before)
+
+    def test_fragment_for_missing_post(self):
+        """Фрагмент несуществующего поста - 404."""
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 999})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class AjaxCommentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse(
+            'posts:add_comment', kwargs={'post_id': self.post.id}
+        )
+
+    def post_ajax(self, data):
+        return self.client.post(
+            self.url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+
+    def test_new_comment_fragment(self):
+        """Скрипт получает только разметку нового комментария."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.post_ajax({'text': 'Новый комментарий'})
+        self.assertEqual(response.status_code, 201)
+        self.assertContains(response, 'Новый комментарий', status_code=201)
+        self.assertNotContains(response, '<html', status_code=201)
+        self.assertEqual(self.post.comments.get().author, self.user)
+        post_selects = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT "posts_post"."id", ')
+        ]
+        self.assertEqual(post_selects, [])
+
+    def test_added_comment_matches_loaded_copy(self):
+        """Дописанный и догруженный комментарий помечены одним id.
+
+        По этой пометке скрипт убирает дописанную копию, когда тот же
+        комментарий приходит в порции «Показать еще».
+        """
+        self.post_ajax({'text': 'Новый комментарий'})
+        marker = 'data-comment-id="{}"'.format(self.post.comments.get().pk)
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        )
+        self.assertContains(response, marker)
+        self.assertContains(
+            self.post_ajax({'text': 'Еще один'}),
+            'data-comment-id="{}"'.format(
+                self.post.comments.latest('id').pk
+            ),
+            status_code=201
+        )
+
+    def test_form_errors_as_json(self):
+        """Ошибки формы возвращаются в JSON без сохранения."""
+        response = self.post_ajax({'text': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['errors']['text'][0]['code'], 'required'
+        )
+        self.assertFalse(Comment.objects.exists())
+
+    def test_missing_post(self):
+        """Комментарий к несуществующему посту - 404."""
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': 999}),
+            {'text': 'Текст'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Comment.objects.exists())
@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        """Счетчики постов и комментариев следуют за созданием и удалением."""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Тестовый коммент'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_follow_counters(self):
+        """Счетчики подписок следуют за подпиской и отпиской."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_deleting_loaded_rows_keeps_counters_at_zero(self):
+        """Удаление записей из фикстур не уводит счетчики ниже нуля."""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        comments = [
+            Comment(
+                post=post, author=self.reader, text='Из фикстуры',
+                created=timezone.now()
+            )
+            for _ in range(2)
+        ]
+        follow = Follow(user=self.reader, author=self.author)
+        for obj in (*comments, follow):
+            obj.save_base(raw=True)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        comments[0].delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        post.delete()
+        self.assertFalse(Comment.objects.exists())
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения счетчиков."""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        Comment.objects.create(
+            post=post, author=self.reader, text='Тестовый коммент'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.update(comments_count=7)
+        UserStats.objects.update(
+            posts_count=5, followers_count=5, following_count=5
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        author_stats = self.stats(self.author)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(author_stats.following_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
@@ -0,0 +1,228 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models.query import QuerySet
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..export import export_chunks
+from ..models import Comment, Follow, Group, Post
+from .test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.first = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый, "с кавычками"'
+        )
+        cls.second = Post.objects.create(
+            author=cls.author, text='Второй с картинкой',
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            )
+        )
+        foreign = Post.objects.create(author=cls.other, text='Чужой пост')
+        cls.third = User.objects.create_user(username='third')
+        Comment.objects.create(
+            post=cls.first, author=cls.other, text='Комментарий'
+        )
+        Comment.objects.create(post=foreign, author=cls.author, text='Чужой')
+        Follow.objects.create(user=cls.other, author=cls.author)
+        Follow.objects.create(user=cls.third, author=cls.other)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def export(self, *args, **options):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command('export_posts', path, *args, stdout=StringIO(), **options)
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def test_jsonl(self):
+        """JSONL - запись в строке, в формате import_posts."""
+        lines = self.export(author='author', chunk_size=1).decode().split(
+            '\n'
+        )
+        self.assertEqual(lines[-1], '')
+        records = [json.loads(line) for line in lines[:-1]]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['post', 'post', 'comment', 'follow']
+        )
+        self.assertEqual(
+            [record['id'] for record in records[:2]],
+            [self.first.pk, self.second.pk]
+        )
+        self.assertEqual(records[0], {
+            'type': 'post',
+            'id': self.first.pk,
+            'author': 'author',
+            'group': 'group',
+            'text': 'Первый, "с кавычками"',
+            'pub_date': records[0]['pub_date'],
+            'image': '',
+        })
+        self.assertEqual(records[2], {
+            'type': 'comment',
+            'post': self.first.pk,
+            'author': 'other',
+            'text': 'Комментарий',
+            'created': records[2]['created'],
+        })
+        self.assertEqual(
+            records[3], {'type': 'follow', 'user': 'other', 'author': 'author'}
+        )
+
+    def test_csv(self):
+        """CSV - заголовок и строка на запись со столбцом типа."""
+        rows = list(csv.DictReader(io.StringIO(
+            self.export(group='group', format='csv').decode()
+        )))
+        self.assertEqual(list(rows[0]), [
+            'type', 'id', 'author', 'group', 'text', 'pub_date', 'image',
+            'post', 'created', 'user'
+        ])
+        self.assertEqual(
+            [row['type'] for row in rows], ['post', 'comment']
+        )
+        self.assertEqual(rows[0]['text'], 'Первый, "с кавычками"')
+        self.assertEqual(rows[1]['post'], str(self.first.pk))
+        self.assertEqual(rows[1]['author'], 'other')
+
+    def test_zip_with_images(self):
+        """Архив содержит выгрузку и файлы картинок."""
+        archive = zipfile.ZipFile(io.BytesIO(
+            self.export(author='author', images=True)
+        ))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(
+            archive.namelist(), ['posts.jsonl', self.second.image.name]
+        )
+        self.assertEqual(archive.read(self.second.image.name), SMALL_GIF)
+        types = [
+            json.loads(line)['type']
+            for line in archive.read('posts.jsonl').splitlines()
+        ]
+        self.assertEqual(types, ['post', 'post', 'comment', 'follow'])
+
+    @override_settings(EXPORT_STREAM_BUFFER=1)
+    def test_zip_is_streamed_in_parts(self):
+        """Архив отдается порциями, а не одним куском в конце."""
+        chunks = list(export_chunks(Post.objects.all(), 'csv', images=True))
+        self.assertGreater(len(chunks), 2)
+        self.assertIsNone(
+            zipfile.ZipFile(io.BytesIO(b''.join(chunks))).testzip()
+        )
+
+    def test_records_are_read_in_chunks(self):
+        """Посты, комментарии и подписки читаются из базы порциями."""
+        iterator = QuerySet.iterator
+        with mock.patch.object(
+            QuerySet, 'iterator', autospec=True, side_effect=iterator
+        ) as patched:
+            self.export(chunk_size=7)
+        models = {
+            call[0][0].model: call[1]['chunk_size']
+            for call in patched.call_args_list
+        }
+        self.assertEqual(models, {Post: 7, Comment: 7, Follow: 7})
+
+    def test_unknown_author(self):
+        """Несуществующий автор - ошибка команды."""
+        with self.assertRaisesMessage(Exception, 'Автор не найден'):
+            self.export(author='nobody')
+
+    def test_view_streams_own_posts(self):
+        """Автор скачивает потоком только свои посты и подписки."""
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:export_posts'))
+        self.assertTrue(response.streaming)
+        self.assertIn('author.jsonl', response['Content-Disposition'])
+        records = [
+            json.loads(line) for line in b''.join(
+                response.streaming_content
+            ).decode().splitlines()
+        ]
+        posts = [record for record in records if record['type'] == 'post']
+        self.assertEqual({record['author'] for record in posts}, {'author'})
+        self.assertEqual(len(posts), 2)
+        self.assertEqual(
+            [record['type'] for record in records[2:]], ['comment', 'follow']
+        )
+        response = self.client.get(
+            reverse('posts:export_posts'), {'format': 'csv', 'images': 1}
+        )
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        self.assertIn('posts.csv', archive.namelist())
+
+    def test_view_rejects_anonymous_and_bad_format(self):
+        """Без входа - на логин, неизвестный формат - 400."""
+        url = reverse('posts:export_posts')
+        response = self.client.get(url)
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={url}'
+        )
+        self.client.force_login(self.author)
+        self.assertEqual(
+            self.client.get(url, {'format': 'xml'}).status_code, 400
+        )
+
+    def test_export_can_be_imported(self):
+        """Выгрузку JSONL можно загрузить обратно через import_posts."""
+        data = self.export(author='author')
+        Post.objects.filter(author=self.author).delete()
+        Follow.objects.filter(author=self.author).delete()
+        handle, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(handle, 'wb') as file:
+            file.write(data)
+        self.addCleanup(os.remove, path)
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.filter(author=self.author).order_by(
+                'pub_date'
+            ).values_list('text', 'group__slug')),
+            [('Первый, "с кавычками"', 'group'), ('Второй с картинкой', None)]
+        )
+        self.assertEqual(
+            list(Comment.objects.filter(
+                post__author=self.author
+            ).values_list('post__text', 'author__username', 'text')),
+            [('Первый, "с кавычками"', 'other', 'Комментарий')]
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.other, author=self.author).exists()
+        )
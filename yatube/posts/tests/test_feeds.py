@@ -0,0 +1,165 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from ..models import FeedItem, Follow, PopularAuthor, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Старый пост',
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed_posts(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_fills_feed_with_author_posts(self):
+        """Подписка добавляет в ленту уже написанные посты автора."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.feed_posts(), [self.post])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост сразу попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.feed_posts(), [new_post, self.post])
+
+    def test_unfollow_clears_feed(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.feed_posts(), [])
+        self.assertFalse(FeedItem.objects.filter(user=self.reader).exists())
+
+    def test_page_number_is_not_ignored(self):
+        """`?page=N` дальше первой страницы ленты - 404."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse('posts:follow_index')
+        response = self.reader_client.get(url, {'page': 1})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        self.assertEqual(
+            self.reader_client.get(url, {'page': 2}).status_code, 404
+        )
+
+    def test_rebuild_feeds_command(self):
+        """Команда rebuild_feeds восстанавливает ленты по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        FeedItem.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(self.feed_posts(), [self.post])
+
+
+@override_settings(FEED_FANOUT_LIMIT=2)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.star = User.objects.create_user(username='star')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        Follow.objects.create(user=self.fan, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_popular_author_is_not_fanned_out(self):
+        """Посты популярного автора не пишутся в ленты подписчиков."""
+        self.assertTrue(PopularAuthor.objects.filter(author=self.star))
+        Post.objects.create(author=self.star, text='Пост звезды')
+        self.assertFalse(FeedItem.objects.filter(post__author=self.star))
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        """Лента сливает разложенные посты и посты популярного автора."""
+        posts = [
+            Post.objects.create(author=author, text='Пост ' + str(i))
+            for i, author in enumerate(
+                [self.star, self.author, self.star, self.author] * 4
+            )
+        ]
+        posts.reverse()
+        pages = []
+        cursor = None
+        while True:
+            response = self.reader_client.get(
+                reverse('posts:follow_index'),
+                {'cursor': cursor} if cursor else {}
+            )
+            pages.append(list(response.context['page_obj']))
+            cursor = response.context['page_obj'].next_cursor
+            if cursor is None:
+                break
+        self.assertEqual([post for page in pages for post in page], posts)
+
+
+class FeedMigrationTests(TransactionTestCase):
+    before = [('posts', '0007_auto_20221218_1703')]
+    after = [('posts', '0009_popularauthor')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        call_command('migrate', verbosity=0)
+
+    @override_settings(FEED_BATCH_SIZE=2, FEED_FANOUT_LIMIT=2)
+    def test_existing_follows_fill_feeds(self):
+        """Миграция раскладывает старые посты по лентам подписчиков."""
+        apps = self.migrate(self.before)
+        OldUser = apps.get_model('auth', 'User')
+        OldPost = apps.get_model('posts', 'Post')
+        OldFollow = apps.get_model('posts', 'Follow')
+        author, popular, first, second = (
+            OldUser.objects.create(username=name)
+            for name in ('author', 'popular', 'first', 'second')
+        )
+        posts = [
+            OldPost.objects.create(author=author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        OldPost.objects.create(author=popular, text='Популярный')
+        OldFollow.objects.create(user=first, author=author)
+        OldFollow.objects.create(user=first, author=popular)
+        OldFollow.objects.create(user=second, author=popular)
+        apps = self.migrate(self.after)
+        FeedItem = apps.get_model('posts', 'FeedItem')
+        self.assertEqual(
+            sorted(FeedItem.objects.values_list('user_id', 'post_id')),
+            [(first.pk, post.pk) for post in posts]
+        )
+        self.assertEqual(
+            list(apps.get_model('posts', 'PopularAuthor').objects.values_list(
+                'author_id', flat=True
+            )),
+            [popular.pk]
+        )
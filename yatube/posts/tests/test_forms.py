@@ -77,7 +77,9 @@ class PostFormTests(TestCase):
         self.assertEqual(post.group, PostFormTests.group)
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.author, PostFormTests.user)
-        self.assertEqual(post.image, 'posts/small.gif')
+        self.assertRegex(
+            post.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
+        )
 
     def test_edit_post(self):
         """Валидная форма редактирует запись в Post."""
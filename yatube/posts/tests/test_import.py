@@ -0,0 +1,201 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..authors import autocomplete
+from ..importer import PostImporter
+from ..models import (
+    Comment, FeedItem, Follow, Group, ImportCheckpoint, ImportedPost, Post,
+    UserStats
+)
+from ..search import search_index
+
+User = get_user_model()
+
+RECORDS = [
+    {'type': 'post', 'id': 'p1', 'author': 'leo', 'group': 'war',
+     'text': 'Все счастливые семьи', 'pub_date': '2001-02-03T04:05:06Z'},
+    {'type': 'post', 'id': 'p2', 'author': 'leo', 'text': 'Второй пост',
+     'pub_date': '2001-02-04T04:05:06Z'},
+    {'type': 'comment', 'post': 'p1', 'author': 'fyodor',
+     'text': 'Согласен', 'created': '2001-02-05T04:05:06Z'},
+    {'type': 'follow', 'user': 'fyodor', 'author': 'leo'},
+    {'type': 'post', 'id': 'p3', 'author': 'leo', 'text': 'Третий пост',
+     'pub_date': '2001-02-06T04:05:06Z'},
+    {'type': 'comment', 'post': 'p3', 'author': 'fyodor',
+     'text': 'Тоже согласен'},
+]
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.leo = User.objects.create_user(username='leo')
+        cls.fyodor = User.objects.create_user(username='fyodor')
+        cls.group = Group.objects.create(
+            title='Война', slug='war', description='Описание'
+        )
+
+    def write(self, records):
+        file = tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', delete=False, encoding='utf-8'
+        )
+        self.addCleanup(os.remove, file.name)
+        with file:
+            for record in records:
+                file.write(
+                    (record if isinstance(record, str) else json.dumps(record))
+                    + '\n'
+                )
+        return file.name
+
+    def import_posts(self, path, **options):
+        out = StringIO()
+        call_command('import_posts', path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_import(self):
+        """Записи создаются с датами из файла, счетчики и ленты сходятся."""
+        out = self.import_posts(self.write(RECORDS), batch_size=2)
+        self.assertIn('строк/с', out)
+        post = Post.objects.get(text='Все счастливые семьи')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(
+            post.pub_date.isoformat(), '2001-02-03T04:05:06+00:00'
+        )
+        self.assertEqual(post.updated, post.pub_date)
+        self.assertEqual(post.comments_count, 1)
+        comment = Comment.objects.get(text='Согласен')
+        self.assertEqual(comment.post, post)
+        self.assertEqual(comment.created.year, 2001)
+        self.assertEqual(
+            Comment.objects.get(text='Тоже согласен').post.text, 'Третий пост'
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.fyodor, author=self.leo).exists()
+        )
+        self.assertEqual(UserStats.objects.get(user=self.leo).posts_count, 3)
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.fyodor).count(), 3
+        )
+        self.assertEqual(search_index('счастливые').count(), 1)
+        self.assertEqual(ImportedPost.objects.count(), 3)
+
+    def test_resume_after_failure(self):
+        """После обрыва импорт продолжается без повторов."""
+        path = self.write(RECORDS)
+        write_batch = PostImporter.write_batch
+        calls = []
+
+        def fail_second_batch(importer, *args):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('обрыв')
+            write_batch(importer, *args)
+
+        with mock.patch.object(
+            PostImporter, 'write_batch', fail_second_batch
+        ), self.assertRaises(RuntimeError):
+            self.import_posts(path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertEqual(ImportCheckpoint.objects.get().lines, 2)
+        self.import_posts(path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get().lines, len(RECORDS))
+        self.import_posts(path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_skipped_records(self):
+        """Плохие строки пропускаются и попадают в отчет по причинам."""
+        out = self.import_posts(self.write([
+            RECORDS[0],
+            '{не json',
+            {'type': 'post', 'id': 'p1', 'author': 'leo', 'text': 'Повтор'},
+            {'type': 'post', 'id': 'x', 'author': 'nobody', 'text': 'Кто'},
+            {'type': 'post', 'id': 'y', 'author': 'leo', 'text': 'Где',
+             'group': 'nope'},
+            {'type': 'post', 'id': 'z', 'author': 'leo', 'text': 'Когда',
+             'pub_date': 'вчера'},
+            {'type': 'comment', 'post': 'nope', 'author': 'leo', 'text': '?'},
+            {'type': 'follow', 'user': 'leo', 'author': 'leo'},
+        ]))
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        for reason in (
+            'bad_record', 'duplicate', 'unknown_author', 'unknown_group',
+            'bad_date', 'unknown_post', 'self_follow'
+        ):
+            with self.subTest(reason=reason):
+                self.assertIn(f'{reason} - 1', out)
+
+    def test_create_authors(self):
+        """С --create-authors неизвестные авторы создаются без пароля."""
+        self.import_posts(self.write([
+            {'type': 'post', 'id': 'n1', 'author': 'anton', 'text': 'Пост'},
+            {'type': 'follow', 'user': 'leo', 'author': 'anton'},
+        ]), create_authors=True)
+        anton = User.objects.get(username='anton')
+        self.assertFalse(anton.has_usable_password())
+        self.assertEqual(anton.posts.count(), 1)
+        self.assertEqual(
+            UserStats.objects.get(user=anton).followers_count, 1
+        )
+        self.assertEqual(autocomplete('ant', 10)[0]['username'], 'anton')
+
+    def test_counts_only_imported_rows(self):
+        """Счетчики и ленты сдвигаются по пачкам без полного пересчета."""
+        anna = User.objects.create_user(username='anna')
+        Follow.objects.create(user=anna, author=self.leo)
+        Post.objects.create(author=self.leo, text='Пост с сайта')
+        records = RECORDS + [
+            {'type': 'follow', 'user': 'fyodor', 'author': 'leo'},
+            {'type': 'follow', 'user': 'anna', 'author': 'leo'},
+        ]
+        with mock.patch('posts.feeds.rebuild_feeds') as rebuild, \
+                mock.patch('posts.counters.reconcile_users') as reconcile:
+            out = self.import_posts(self.write(records), batch_size=3)
+        rebuild.assert_not_called()
+        reconcile.assert_not_called()
+        self.assertIn('duplicate - 2', out)
+        self.assertEqual(Follow.objects.filter(author=self.leo).count(), 2)
+        stats = UserStats.objects.get(user=self.leo)
+        self.assertEqual(stats.posts_count, 4)
+        self.assertEqual(stats.followers_count, 2)
+        self.assertEqual(
+            UserStats.objects.get(user=self.fyodor).following_count, 1
+        )
+        for user in (anna, self.fyodor):
+            with self.subTest(user=user.username):
+                self.assertEqual(
+                    FeedItem.objects.filter(user=user).count(), 4
+                )
+
+    def test_batch_locks_before_allocating_ids(self):
+        """Пачка пишет в базу раньше, чем читает Max(id) для новых постов."""
+        importer = PostImporter('locks', batch_size=10)
+        checkpoint = ImportCheckpoint.objects.create(source='locks')
+        lines = [json.dumps(record).encode() for record in RECORDS[:2]]
+        with CaptureQueriesContext(connection) as queries:
+            importer.write_batch(lines, checkpoint, 0)
+        sql = [query['sql'] for query in queries.captured_queries]
+        first_write = next(
+            index for index, query in enumerate(sql)
+            if query.startswith('UPDATE')
+        )
+        max_id = next(
+            index for index, query in enumerate(sql) if 'MAX(' in query
+        )
+        self.assertIn('posts_importcheckpoint', sql[first_write])
+        self.assertLess(first_write, max_id)
@@ -0,0 +1,126 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from .. import media
+from ..media import delete_unreferenced, reconcile_media
+from ..models import MediaFile, Post
+from .test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaReferenceTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        patcher = mock.patch('posts.thumbnails.schedule_thumbnails')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.posts = [
+            Post.objects.create(
+                author=self.user,
+                text='Пост с картинкой',
+                image=SimpleUploadedFile(
+                    name, SMALL_GIF, content_type='image/gif'
+                ),
+            )
+            for name in ('small.gif', 'copy.gif')
+        ]
+        self.name = self.posts[0].image.name
+
+    def references(self):
+        return MediaFile.objects.get(name=self.name).references
+
+    def test_same_image_is_shared(self):
+        """Повторная загрузка ссылается на уже сохраненный файл."""
+        self.assertEqual(self.posts[1].image.name, self.name)
+        self.assertEqual(self.references(), 2)
+
+    def test_file_survives_while_referenced(self):
+        """Файл остается, пока на него ссылается хотя бы один пост."""
+        self.posts[0].delete()
+        self.assertEqual(self.references(), 1)
+        self.assertFalse(delete_unreferenced(self.name))
+        self.assertTrue(self.posts[1].image.storage.exists(self.name))
+
+    def test_unreferenced_file_is_deleted(self):
+        """После удаления последнего поста файл удаляется."""
+        storage = self.posts[1].image.storage
+        for post in self.posts:
+            post.delete()
+        self.assertTrue(delete_unreferenced(self.name))
+        self.assertFalse(storage.exists(self.name))
+        self.assertFalse(MediaFile.objects.filter(name=self.name).exists())
+
+    def test_replacing_image_moves_reference(self):
+        """Замена картинки переносит ссылку на новый файл."""
+        post = self.posts[0]
+        post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\0', content_type='image/gif'
+        )
+        post.save()
+        self.assertEqual(self.references(), 1)
+        self.assertEqual(
+            MediaFile.objects.get(name=post.image.name).references, 1
+        )
+
+    def test_reconcile_fixes_drift(self):
+        """Сверка восстанавливает счетчики по постам."""
+        MediaFile.objects.filter(name=self.name).update(references=7)
+        MediaFile.objects.create(name='posts/lost.gif', references=3)
+        self.assertEqual(reconcile_media(100), 2)
+        self.assertEqual(self.references(), 2)
+        self.assertEqual(
+            MediaFile.objects.get(name='posts/lost.gif').references, 0
+        )
+
+    def test_reconcile_creates_missing_rows_in_batches(self):
+        """Сверка пачками заводит записи для файлов без них."""
+        MediaFile.objects.all().delete()
+        self.assertEqual(reconcile_media(1), 1)
+        self.assertEqual(self.references(), 2)
+        self.assertEqual(reconcile_media(1), 0)
+
+    def test_file_deleted_during_upload_is_restored(self):
+        """Файл, удаленный до записи ссылки на него, возвращается.
+
+        Загрузка застает файл на месте, но удаление из другого запроса
+        успевает забрать его до того, как новый пост сошлется на него.
+        """
+        for post in self.posts:
+            post.delete()
+        add_reference = media.add_reference
+
+        def delete_first(name, content=None):
+            self.assertTrue(delete_unreferenced(name))
+            add_reference(name, content)
+
+        with mock.patch.object(media, 'add_reference', delete_first):
+            post = Post.objects.create(
+                author=self.user,
+                text='Та же картинка',
+                image=SimpleUploadedFile(
+                    'again.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            )
+        self.assertEqual(post.image.name, self.name)
+        with open(post.image.path, 'rb') as stored:
+            self.assertEqual(stored.read(), SMALL_GIF)
+        self.assertEqual(self.references(), 1)
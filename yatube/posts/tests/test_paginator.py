@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(25):
+            Post.objects.create(
+                author=cls.user,
+                text='Тестовый пост ' + str(i),
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def walk(self, url):
+        """Проходит ленту по курсорам и возвращает страницы."""
+        pages = []
+        cursor = None
+        while True:
+            response = self.guest_client.get(
+                url, {'cursor': cursor} if cursor else {}
+            )
+            page_obj = response.context['page_obj']
+            pages.append(page_obj)
+            cursor = page_obj.next_cursor
+            if cursor is None:
+                return pages
+
+    def test_cursor_walk_returns_every_post_once(self):
+        """Переход по курсорам выдает все посты по порядку без повторов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                pages = self.walk(url)
+                self.assertEqual(
+                    [len(page_obj) for page_obj in pages], [10, 10, 5]
+                )
+                self.assertEqual(
+                    [post.id for page in pages for post in page], expected
+                )
+                self.assertEqual(
+                    [page_obj.number for page_obj in pages], [1, 2, 3]
+                )
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает ту же страницу, что была до нее."""
+        url = reverse('posts:index')
+        first, second, _ = self.walk(url)
+        cache.clear()
+        response = self.guest_client.get(
+            url, {'cursor': second.previous_cursor}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), list(first))
+        self.assertEqual(page_obj.number, 1)
+        self.assertIsNone(first.previous_cursor)
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор показывает первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_cursor_page_does_not_count_rows(self):
+        """Страница по курсору не выполняет COUNT(*)."""
+        first = self.walk(reverse('posts:index'))[0]
+        cache.clear()
+        with self.assertNumQueries(1):
+            page_obj = first.paginator.get_cursor_page(first.next_cursor)
+            self.assertEqual(len(page_obj), 10)
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число запросов страниц не зависит от числа постов на странице."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_content(self):
+        for i in range(15):
+            author = User.objects.create_user(username='author' + str(i))
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(
+                author=author, text='Пост ' + str(i), group=self.group
+            )
+            Comment.objects.create(
+                post=self.post, author=author, text='Коммент ' + str(i)
+            )
+
+    def check_budgets(self):
+        budgets = {
+            reverse('posts:index'): 3,
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}): 4,
+            reverse('posts:profile', kwargs={'username': 'author'}): 5,
+            reverse('posts:follow_index'): 4,
+            reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}
+            ): 5,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertMaxQueries(budget):
+                    self.client.get(url)
+
+    def test_budget_with_one_post(self):
+        """Страницы с одним постом укладываются в бюджет запросов."""
+        self.check_budgets()
+
+    def test_budget_with_full_page(self):
+        """Страницы с полной лентой укладываются в тот же бюджет."""
+        self.add_content()
+        self.check_budgets()
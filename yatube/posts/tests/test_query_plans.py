@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, PopularAuthor, Post
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    """Запросы страниц идут по индексам, без полного обхода и сортировки."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        PopularAuthor.objects.create(author=cls.star)
+        for i in range(24):
+            Post.objects.create(
+                author=cls.author if i % 2 else cls.star,
+                text='Тестовый пост ' + str(i),
+                group=cls.group,
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Тестовый коммент'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for step in self.query_plan(sql):
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertNotIn('TEMP B-TREE', step)
+                    if step.startswith('SCAN'):
+                        self.assertIn('USING', step)
+
+    def test_feed_queries_use_indexes(self):
+        """Ленты читаются по индексам на всех страницах."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            response = self.client.get(url)
+            self.assert_indexed(url)
+            cursor = response.context['page_obj'].next_cursor
+            self.assert_indexed(url + '?cursor=' + cursor)
+
+    def test_api_queries_use_indexes(self):
+        """Ленты API читаются по тем же индексам."""
+        urls = [
+            reverse('posts:api_index'),
+            reverse('posts:api_group_posts', args=[self.group.slug]),
+            reverse('posts:api_profile', args=['author']),
+            reverse('posts:api_follow_index'),
+        ]
+        for url in urls:
+            cursor = self.client.get(url).json()['next_cursor']
+            self.assert_indexed(url)
+            self.assert_indexed(url + '?cursor=' + cursor)
+
+    def test_post_detail_queries_use_indexes(self):
+        """Страница поста и комментарии читаются по индексам."""
+        self.assert_indexed(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assert_indexed(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        )
@@ -0,0 +1,152 @@
+import warnings
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import FieldError
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SearchPaginator, install_index, search_index
+
+User = get_user_model()
+
+
+def found_ids(query):
+    return [row.post_id for row in search_index(query).order_by('rank')]
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.once = Post.objects.create(
+            author=cls.user, text='Кошка спит на диване'
+        )
+        cls.twice = Post.objects.create(
+            author=cls.user, text='Кошки, кошки и еще раз кошки'
+        )
+        Post.objects.create(author=cls.user, text='Собака гуляет')
+
+    def test_results_are_ranked(self):
+        """Пост, где слово встречается чаще, идет первым."""
+        self.assertEqual(found_ids('кошк'), [self.twice.pk, self.once.pk])
+
+    def test_query_is_case_insensitive_prefix(self):
+        """Слова ищутся без учета регистра и по началу слова."""
+        self.assertEqual(found_ids('КОШ спит'), [self.once.pk])
+
+    def test_query_syntax_is_not_exposed(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(found_ids('"кошка" OR NEAR('), [])
+        self.assertEqual(found_ids('   '), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.once.pk)
+        post.text = 'Попугай спит на жердочке'
+        post.save()
+        self.assertEqual(found_ids('кошка'), [])
+        self.assertEqual(found_ids('попугай'), [post.pk])
+        post.delete()
+        self.assertEqual(found_ids('попугай'), [])
+
+    def test_bulk_create_is_indexed(self):
+        """Посты, созданные в обход save, тоже попадают в индекс."""
+        Post.objects.bulk_create([Post(author=self.user, text='Хомяк')])
+        self.assertEqual(len(found_ids('хомяк')), 1)
+
+    def test_match_exists_only_on_index(self):
+        """Поиск `__match` есть только у столбца индекса."""
+        with self.assertRaises(FieldError):
+            Post.objects.filter(text__match='кошка')
+
+    def test_lost_triggers_are_restored(self):
+        """После потери триггеров индекс восстанавливается и догоняет."""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_insert')
+        Post.objects.create(author=self.user, text='Черепаха')
+        self.assertEqual(found_ids('черепаха'), [])
+        self.assertTrue(install_index())
+        self.assertFalse(install_index())
+        self.assertEqual(len(found_ids('черепаха')), 1)
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Прогулка номер {i}')
+            for i in range(settings.POSTS_PER_PAGE + 3)
+        )
+        Post.objects.create(author=cls.user, text='Совсем другое')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_search_pages_by_cursor(self):
+        """Результаты листаются по курсору без повторов и пропусков."""
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'прогулка'})
+        first = response.context['page_obj']
+        self.assertEqual(len(first), settings.POSTS_PER_PAGE)
+        response = self.client.get(
+            url, {'q': 'прогулка', 'cursor': first.next_cursor}
+        )
+        second = response.context['page_obj']
+        self.assertEqual(len(second), 3)
+        self.assertIsNone(second.next_cursor)
+        ids = [post.pk for post in list(first) + list(second)]
+        self.assertEqual(len(set(ids)), settings.POSTS_PER_PAGE + 3)
+
+    def test_page_number_is_not_ignored(self):
+        """`?page=N` дальше первой страницы - 404, а не первая страница."""
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'прогулка', 'page': 1})
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POSTS_PER_PAGE
+        )
+        response = self.client.get(url, {'q': 'прогулка', 'page': 2})
+        self.assertEqual(response.status_code, 404)
+
+    def test_results_are_ordered(self):
+        """Постраничный вывод получает упорядоченный queryset."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            self.client.get(reverse('posts:search'), {'q': 'прогулка'})
+
+    def test_empty_query_shows_form(self):
+        """Без запроса страница показывает только форму."""
+        response = self.client.get(reverse('posts:search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_paginator_does_not_count(self):
+        """Страница поиска не считает все совпадения."""
+        with CaptureQueriesContext(connection) as context:
+            list(SearchPaginator('прогулка', 5).get_cursor_page(None))
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через индекс, а не через LIKE."""
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'другое'}
+            )
+        self.assertEqual(response.context['cl'].result_count, 1)
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertIn('MATCH', sql)
+        self.assertNotIn('LIKE', sql)
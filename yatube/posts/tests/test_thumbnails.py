@@ -0,0 +1,209 @@
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, ThumbnailJob
+from ..thumbnails import (
+    WEBP_SUPPORTED, built_thumbnail, claim_job, find_thumbnails,
+    generate_thumbnails, prefetch_thumbnails, process_jobs, retry_failed_jobs
+)
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        with mock.patch('posts.thumbnails.schedule_thumbnails') as schedule:
+            self.post = Post.objects.create(
+                author=self.user,
+                text='Пост с картинкой',
+                image=SimpleUploadedFile(
+                    'small.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            )
+        self.scheduled = schedule.call_args_list
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_saving_image_schedules_thumbnails(self):
+        """Сохранение картинки ставит миниатюры в фоновую очередь."""
+        self.assertEqual(self.scheduled, [mock.call(self.post.image.name)])
+        with mock.patch('posts.thumbnails.schedule_thumbnails') as schedule:
+            self.post.text = 'Правка без новой картинки'
+            self.post.save()
+        schedule.assert_not_called()
+
+    def test_render_does_not_build_thumbnails(self):
+        """Страница без готовой миниатюры показывает заглушку."""
+        with mock.patch('posts.thumbnails.schedule_thumbnails') as schedule:
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'aspect-ratio')
+        self.assertNotContains(response, '<img class="card-img')
+        self.assertIsNone(built_thumbnail(self.post.image.name, 'card'))
+        schedule.assert_called_once_with(self.post.image.name)
+
+    def test_worker_processes_queue(self):
+        """Обработчик очереди создает миниатюры и удаляет задачу."""
+        ThumbnailJob.objects.create(image=self.post.image.name)
+        self.assertEqual(process_jobs(), 1)
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertIsNotNone(built_thumbnail(self.post.image.name, 'card'))
+
+    @override_settings(THUMBNAIL_MAX_ATTEMPTS=2)
+    def test_failed_job_is_kept(self):
+        """Неудачная задача повторяется после таймаута, затем остается."""
+        ThumbnailJob.objects.create(image='missing.gif')
+        self.assertEqual(process_jobs(), 1)
+        self.assertEqual(ThumbnailJob.objects.get().attempts, 1)
+        with override_settings(THUMBNAIL_JOB_TIMEOUT=-1):
+            self.assertEqual(process_jobs(), 1)
+            self.assertEqual(ThumbnailJob.objects.get().attempts, 2)
+            self.assertEqual(process_jobs(), 0)
+            with mock.patch(
+                'posts.thumbnails.transaction.on_commit',
+                lambda callback: callback()
+            ):
+                find_thumbnails(['missing.gif'])
+            self.assertEqual(ThumbnailJob.objects.get().attempts, 2)
+            self.assertEqual(retry_failed_jobs(), 1)
+            self.assertIsNotNone(claim_job())
+
+    def test_claimed_job_is_not_shared(self):
+        """Взятую задачу другой обработчик получит только после таймаута."""
+        ThumbnailJob.objects.create(image=self.post.image.name)
+        self.assertIsNotNone(claim_job())
+        self.assertIsNone(claim_job())
+        with override_settings(THUMBNAIL_JOB_TIMEOUT=-1):
+            self.assertIsNotNone(claim_job())
+
+    def test_built_thumbnail_is_shown(self):
+        """Готовая миниатюра сразу появляется на закэшированных страницах."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        with mock.patch('posts.thumbnails.schedule_thumbnails'):
+            for url in urls:
+                self.guest_client.get(url)
+        generate_thumbnails(self.post.image.name)
+        thumbnail = built_thumbnail(self.post.image.name, 'card')
+        self.assertIsNotNone(thumbnail)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, thumbnail.url)
+                self.assertContains(response, 'srcset=')
+
+    def test_variants_are_listed_in_srcset(self):
+        """Для srcset создаются варианты всех ширин."""
+        generate_thumbnails(self.post.image.name)
+        post, = prefetch_thumbnails([self.post])
+        entries = post.srcset['default'].split(', ')
+        self.assertEqual(
+            [entry.split()[-1] for entry in entries], ['480w', '960w', '1440w']
+        )
+
+    @skipUnless(WEBP_SUPPORTED, 'Pillow собран без поддержки WebP')
+    def test_webp_variants(self):
+        """Каждая ширина есть и в WebP."""
+        generate_thumbnails(self.post.image.name)
+        post, = prefetch_thumbnails([self.post])
+        entries = post.srcset['webp'].split(', ')
+        self.assertEqual(len(entries), 3)
+        self.assertTrue(all('.webp ' in entry for entry in entries))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PrefetchThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+        with mock.patch('posts.thumbnails.schedule_thumbnails'):
+            self.posts = [
+                Post.objects.create(
+                    author=self.user,
+                    text='Тестовый пост ' + str(i),
+                    image=f'posts/missing-{i}.jpg',
+                )
+                for i in range(settings.POSTS_PER_PAGE)
+            ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def kvstore_queries(self, posts):
+        with CaptureQueriesContext(connection) as context:
+            with mock.patch('posts.thumbnails.schedule_thumbnails'):
+                prefetch_thumbnails(posts)
+        return [
+            query for query in context.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+
+    def test_page_is_resolved_with_one_query(self):
+        """Миниатюры всей страницы ищутся одним запросом, затем из кэша."""
+        self.assertEqual(len(self.kvstore_queries(self.posts)), 1)
+        self.assertEqual(len(self.kvstore_queries(self.posts)), 0)
+        self.assertTrue(all(post.thumbnail is None for post in self.posts))
+
+    def test_missing_thumbnails_are_scheduled(self):
+        """Для постов без готовой миниатюры запускается генерация."""
+        with mock.patch('posts.thumbnails.schedule_thumbnails') as schedule:
+            prefetch_thumbnails(self.posts[:2])
+        schedule.assert_called_once_with(
+            *(post.image.name for post in self.posts[:2])
+        )
+
+    def test_built_thumbnail_is_attached(self):
+        """Готовая миниатюра попадает в атрибут `thumbnail` поста."""
+        post = self.posts[0]
+        with mock.patch('posts.thumbnails.schedule_thumbnails'):
+            post.image = SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            )
+            post.save()
+        self.kvstore_queries([post])
+        generate_thumbnails(post.image.name)
+        prefetch_thumbnails([post])
+        self.assertEqual(
+            post.thumbnail.url, built_thumbnail(post.image.name, 'card').url
+        )
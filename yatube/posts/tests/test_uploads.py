@@ -0,0 +1,175 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, JpegImagePlugin
+
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+ORIENTATION_TAG = 0x0112
+ROTATED_90 = 6
+MAKE_TAG = 0x010F
+
+
+def make_upload(name, size, image_format='JPEG', exif=None):
+    buffer = BytesIO()
+    options = {'exif': exif.tobytes()} if exif is not None else {}
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIDE=100)
+class UploadPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        patcher = mock.patch('posts.thumbnails.schedule_thumbnails')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_post(self, upload):
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': upload,
+        })
+        self.assertEqual(response.status_code, 302)
+        return Post.objects.get(text='Пост с картинкой')
+
+    def test_large_image_is_downscaled(self):
+        """Большая сторона картинки уменьшается до IMAGE_MAX_SIDE."""
+        post = self.create_post(make_upload('photo.jpg', (1600, 1200)))
+        self.assertRegex(
+            post.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$'
+        )
+        self.assertEqual((post.image_width, post.image_height), (100, 75))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (100, 75))
+
+    def test_jpeg_is_decoded_in_draft_mode(self):
+        """JPEG декодируется сразу в уменьшенном масштабе."""
+        draft_method = JpegImagePlugin.JpegImageFile.draft
+        with mock.patch.object(
+            JpegImagePlugin.JpegImageFile, 'draft', autospec=True,
+            side_effect=draft_method
+        ) as draft:
+            self.create_post(make_upload('photo.jpg', (1600, 1200)))
+        draft.assert_any_call(mock.ANY, None, (100, 100))
+
+    def test_metadata_is_stripped_after_rotation(self):
+        """Поворот из EXIF применяется, а сами метаданные удаляются."""
+        exif = Image.Exif()
+        exif[ORIENTATION_TAG] = ROTATED_90
+        exif[MAKE_TAG] = 'Camera'
+        uploads = (('photo.jpg', 'JPEG'), ('photo.png', 'PNG'))
+        for name, image_format in uploads:
+            with self.subTest(image_format=image_format):
+                post = self.create_post(
+                    make_upload(name, (160, 80), image_format, exif=exif)
+                )
+                self.assertEqual(
+                    (post.image_width, post.image_height), (50, 100)
+                )
+                with Image.open(post.image.path) as stored:
+                    self.assertEqual(stored.size, (50, 100))
+                    self.assertNotIn('exif', stored.info)
+                    self.assertNotIn(MAKE_TAG, stored.getexif())
+                post.delete()
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_are_rejected(self):
+        """Картинку больше IMAGE_MAX_PIXELS форма не принимает."""
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': make_upload('huge.png', (20, 20), 'PNG'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].has_error('image'))
+        self.assertFalse(Post.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageDimensionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('posts.thumbnails.schedule_thumbnails')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=make_upload('photo.png', (30, 20), 'PNG'),
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_dimensions_are_stored_on_save(self):
+        """Размеры новой картинки записываются вместе с постом."""
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (30, 20)
+        )
+
+    def test_rendering_does_not_open_files(self):
+        """Лента и пост рендерятся без чтения файлов картинок."""
+        Post.objects.update(image_width=None, image_height=None)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        with mock.patch.object(
+            FileSystemStorage, 'open', side_effect=AssertionError
+        ):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_original_size_is_shown(self):
+        """На странице поста указан размер оригинала."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, '30&times;20')
+
+    def test_backfill_command(self):
+        """Команда заполняет пустые размеры и считает пропавшие файлы."""
+        Post.objects.create(
+            author=self.user, text='Без файла', image='posts/missing.png'
+        )
+        Post.objects.update(image_width=None, image_height=None)
+        out = StringIO()
+        call_command('backfill_image_sizes', batch_size=1, stdout=out)
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (30, 20)
+        )
+        self.assertIn(
+            'Заполнено постов: 1, файлов не найдено: 1', out.getvalue()
+        )
@@ -106,7 +106,7 @@ class PostViewTests(TestCase):
         post_image_0 = first_object.image
         self.assertEqual(post_text_0, 'Тестовый пост')
         self.assertEqual(post_group_0, 'Тестовый заголовок')
-        self.assertEqual(post_image_0, 'posts/small.gif')
+        self.assertEqual(post_image_0, self.post.image)
 
     def test_group_list_page_show_correct_context(self):
         """Шаблон group_list сформирован с правильным контекстом."""
@@ -120,7 +120,7 @@ class PostViewTests(TestCase):
         post_image_0 = first_object.image
         self.assertEqual(post_text_0, 'Тестовый пост')
         self.assertEqual(group_title_test_0, 'Тестовый заголовок')
-        self.assertEqual(post_image_0, 'posts/small.gif')
+        self.assertEqual(post_image_0, self.post.image)
 
     def test_profile_page_show_correct_context(self):
         """Шаблон profile сформирован с правильным контекстом."""
@@ -134,7 +134,7 @@ class PostViewTests(TestCase):
         post_image_0 = first_object.image
         self.assertEqual(post_text_0, 'Тестовый пост')
         self.assertEqual(author_test_0, PostViewTests.auth_create)
-        self.assertEqual(post_image_0, 'posts/small.gif')
+        self.assertEqual(post_image_0, self.post.image)
 
     def test_post_detail_pages_show_correct_context(self):
         """Шаблон post_detail сформирован с правильным контекстом."""
@@ -150,7 +150,7 @@ class PostViewTests(TestCase):
         post_image_0 = first_object.image
         post_comment = PostViewTests.comments.text
         self.assertEqual(post_text_0, 'Тестовый пост')
-        self.assertEqual(post_image_0, 'posts/small.gif')
+        self.assertEqual(post_image_0, self.post.image)
         self.assertEqual(post_comment, 'Тестовый коммент')
 
     def test_post_create_pages_show_correct_context(self):
@@ -0,0 +1,262 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import features
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore
+
+from .caching import invalidate_post
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+# Сколько старейших задач просматривает обработчик, выбирая свободную.
+CLAIM_CANDIDATES = 10
+
+# WebP-варианты создаются, только если Pillow собран с libwebp.
+WEBP_SUPPORTED = features.check('webp')
+
+
+def variants(size):
+    """Варианты размера для srcset: (имя, ширина, это ли WebP)."""
+    result = []
+    for width in settings.THUMBNAIL_VARIANT_WIDTHS:
+        result.append((f'{size}@{width}', width, False))
+        if WEBP_SUPPORTED:
+            result.append((f'{size}@{width}.webp', width, True))
+    return result
+
+
+def thumbnail_specs():
+    """Все миниатюры картинки: имя -> (геометрия, параметры sorl).
+
+    Кроме размеров из THUMBNAIL_SIZES, у каждого есть варианты шириной
+    THUMBNAIL_VARIANT_WIDTHS с теми же пропорциями - в формате
+    исходника и в WebP.
+    """
+    specs = {}
+    for size, (geometry, options) in settings.THUMBNAIL_SIZES.items():
+        specs[size] = (geometry, options)
+        width, height = map(int, geometry.split('x'))
+        for name, variant_width, webp in variants(size):
+            variant_height = round(height * variant_width / width)
+            variant_options = dict(options)
+            if webp:
+                variant_options['format'] = 'WEBP'
+            specs[name] = (
+                f'{variant_width}x{variant_height}', variant_options
+            )
+    return specs
+
+
+def thumbnail_options(source, size):
+    """Геометрия и полный набор параметров, как их дополнит sorl."""
+    geometry, options = thumbnail_specs()[size]
+    options = dict(options)
+    backend = default.backend
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return geometry, options
+
+
+def thumbnail_file(name, size):
+    """Файл миниатюры, который sorl создаст для исходника `name`."""
+    source = ImageFile(name)
+    geometry, options = thumbnail_options(source, size)
+    return ImageFile(
+        default.backend._get_thumbnail_filename(source, geometry, options),
+        default.storage
+    )
+
+
+def built_thumbnail(name, size):
+    """Готовая миниатюра из хранилища sorl или None; ничего не создает."""
+    return default.kvstore.get(thumbnail_file(name, size))
+
+
+def _load_raw(keys):
+    """Сырые значения хранилища sorl: один get_many и один запрос к БД."""
+    kvstore = default.kvstore
+    if not keys:
+        return {}
+    if not isinstance(kvstore, CachedDBStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStore.objects.filter(key__in=missing).values_list(
+            'key', 'value'
+        ))
+        # Как и sorl, запоминаем отсутствие, чтобы не ходить в БД снова.
+        kvstore.cache.set_many(
+            {key: found.get(key, EMPTY_VALUE) for key in missing},
+            sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(found)
+    return values
+
+
+def srcsets(found, size):
+    """Строки srcset из готовых вариантов: обычная и WebP."""
+    entries = {'default': [], 'webp': []}
+    for name, width, webp in variants(size):
+        thumbnail = found.get(name)
+        if thumbnail is not None:
+            entries['webp' if webp else 'default'].append(
+                f'{thumbnail.url} {thumbnail.width}w'
+            )
+    return {kind: ', '.join(items) for kind, items in entries.items()}
+
+
+def find_thumbnails(names, size='card'):
+    """Готовые миниатюры картинок `names` одним чтением на всех.
+
+    Тег `thumbnail` делает для каждой картинки отдельные обращения к
+    хранилищу sorl; здесь ключи всех миниатюр и их вариантов читаются
+    разом. Возвращает словарь имя -> (миниатюра или None, srcset), где
+    srcset - словарь со строками 'default' и 'webp'. Недостающие
+    миниатюры ставятся в очередь.
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+    specs = [size] + [name for name, _, _ in variants(size)]
+    keys = {
+        name: {
+            spec: add_prefix(thumbnail_file(name, spec).key)
+            for spec in specs
+        }
+        for name in names
+    }
+    values = _load_raw([
+        key for image_keys in keys.values() for key in image_keys.values()
+    ])
+    result = {}
+    missing = []
+    for name, image_keys in keys.items():
+        found = {}
+        for spec, key in image_keys.items():
+            value = values.get(key)
+            if value and value != EMPTY_VALUE:
+                found[spec] = deserialize_image_file(value)
+        result[name] = (found.get(size), srcsets(found, size))
+        if len(found) < len(specs):
+            missing.append(name)
+    schedule_thumbnails(*missing)
+    return result
+
+
+def prefetch_thumbnails(posts, size='card'):
+    """Проставляет постам `thumbnail` и `srcset` из `find_thumbnails`."""
+    posts = list(posts)
+    found = find_thumbnails(
+        [post.image.name for post in posts if post.image], size
+    )
+    for post in posts:
+        post.thumbnail, post.srcset = found.get(
+            post.image.name, (None, srcsets({}, size))
+        )
+    return posts
+
+
+def generate_thumbnails(name):
+    """Создает все миниатюры изображения и сбрасывает страницы с ним.
+
+    Возвращает, готовы ли все миниатюры.
+    """
+    specs = thumbnail_specs()
+    try:
+        for geometry, options in specs.values():
+            get_thumbnail(name, geometry, **options)
+        ready = all(built_thumbnail(name, size) for size in specs)
+        if ready:
+            thumbnails_ready(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+        return False
+    return ready
+
+
+def thumbnails_ready(name):
+    """Карточки и страницы с заглушкой перерисуются с миниатюрой."""
+    posts = list(Post.objects.filter(image=name).only(
+        'pk', 'author_id', 'group_id'
+    ))
+    Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+        updated=timezone.now()
+    )
+    for post in posts:
+        invalidate_post(post)
+
+
+def schedule_thumbnails(*names):
+    """Ставит картинки в очередь фонового обработчика.
+
+    Задачи записываются после фиксации транзакции, чтобы обработчик
+    не взял картинку поста, который еще не сохранен. Картинка, уже
+    стоящая в очереди, второй раз не добавляется - в том числе
+    сбойная, так что промах карточки не ставит ее снова.
+    """
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: ThumbnailJob.objects.bulk_create(
+            [ThumbnailJob(image=name) for name in names],
+            ignore_conflicts=True
+        ))
+
+
+def claim_job():
+    """Берет свободную, зависшую или неудачную задачу; None, если их нет.
+
+    Задачу забирает тот обработчик, чей UPDATE с тем же условием
+    изменил строку, поэтому несколько процессов не делят одну задачу.
+    Сбойные задачи, исчерпавшие попытки, не берутся.
+    """
+    stale = timezone.now() - timedelta(seconds=settings.THUMBNAIL_JOB_TIMEOUT)
+    free = (Q(started__isnull=True) | Q(started__lt=stale)) & Q(
+        attempts__lt=settings.THUMBNAIL_MAX_ATTEMPTS
+    )
+    for job in ThumbnailJob.objects.filter(free)[:CLAIM_CANDIDATES]:
+        if ThumbnailJob.objects.filter(free, pk=job.pk).update(
+            started=timezone.now()
+        ):
+            return job
+    return None
+
+
+def process_jobs():
+    """Выполняет задачи, пока очередь не опустеет; возвращает их число."""
+    done = 0
+    while True:
+        job = claim_job()
+        if job is None:
+            return done
+        if generate_thumbnails(job.image):
+            job.delete()
+        else:
+            # Задача остается взятой и повторится после таймаута.
+            ThumbnailJob.objects.filter(pk=job.pk).update(
+                attempts=F('attempts') + 1
+            )
+        done += 1
+
+
+def retry_failed_jobs():
+    """Возвращает в очередь сбойные задачи; возвращает их число."""
+    return ThumbnailJob.objects.filter(
+        attempts__gte=settings.THUMBNAIL_MAX_ATTEMPTS
+    ).update(attempts=0, started=None)
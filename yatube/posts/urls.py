@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -9,13 +9,25 @@ urlpatterns = [
     path('group/<slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.search, name='search'),
+    path(
+        'authors/autocomplete/',
+        views.author_autocomplete,
+        name='author_autocomplete'
+    ),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'
     ),
+    path('export/', views.export_posts, name='export_posts'),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
@@ -27,4 +39,18 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/group/<slug>/', api.group_posts, name='api_group_posts'),
+    path('api/profile/<str:username>/', api.profile, name='api_profile'),
+    path('api/follow/', api.follow_index, name='api_follow_index'),
+    path(
+        'api/posts/<int:post_id>/',
+        api.post_detail,
+        name='api_post_detail'
+    ),
+    path(
+        'api/posts/<int:post_id>/comments/',
+        api.post_comments,
+        name='api_post_comments'
+    ),
 ]
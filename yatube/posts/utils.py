@@ -0,0 +1,38 @@
+from django.conf import settings
+
+from core.paginator import CursorPaginator
+
+from .models import Comment
+
+POST_ORDERING = ('-pub_date', '-id')
+COMMENT_ORDERING = ('created', 'id')
+
+
+def paginate(request, paginator):
+    """Страница `paginator` по курсору из запроса.
+
+    Старые ссылки `?page=N` продолжают работать через номер страницы.
+    """
+    cursor = request.GET.get('cursor')
+    page_number = request.GET.get('page')
+    if not cursor and page_number:
+        return paginator.get_page(page_number)
+    return paginator.get_cursor_page(cursor)
+
+
+def get_page(request, queryset, ordering=POST_ORDERING):
+    return paginate(
+        request,
+        CursorPaginator(queryset, settings.POSTS_PER_PAGE, ordering)
+    )
+
+
+def get_comment_page(request, post_id):
+    """Порция комментариев поста со старых к новым вместе с авторами."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).order_by(*COMMENT_ORDERING)
+    return paginate(
+        request,
+        CursorPaginator(comments, settings.COMMENTS_PER_PAGE, COMMENT_ORDERING)
+    )
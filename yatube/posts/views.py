@@ -1,19 +1,32 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import (
+    Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
-
+from django.views.decorators.cache import cache_control
+
+from core.cache import versioned_cache_page
+
+from .authors import autocomplete
+from .caching import (
+    INDEX_NAMESPACE, group_page, post_meta, post_page, profile_page
+)
+from .export import (
+    CONTENT_TYPES, FORMATS, author_follows, export_chunks, export_filename
+)
+from .feeds import FeedPaginator
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .search import SearchPaginator
+from .thumbnails import prefetch_thumbnails
+from .utils import get_comment_page, get_page, paginate
 
 
-@cache_page(20, key_prefix='index_page')
+@versioned_cache_page(INDEX_NAMESPACE)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = get_page(request, post_list)
     title = 'Последние обновления на сайте'
     context = {
         'title': title,
@@ -22,12 +35,13 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@versioned_cache_page(group_page)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group).all()
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.filter(group=group).select_related(
+        'author', 'group'
+    )
+    page_obj = get_page(request, post_list)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -35,15 +49,16 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@versioned_cache_page(profile_page)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     following = False
     if request.user.is_authenticated:
         following = request.user.follower.filter(author=author).exists()
-    posts = author.posts.all()
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = author.posts.select_related('author', 'group')
+    page_obj = get_page(request, posts)
     context = {
         'author': author,
         'page_obj': page_obj,
@@ -52,9 +67,37 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@versioned_cache_page(INDEX_NAMESPACE)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = paginate(
+        request, SearchPaginator(query, settings.POSTS_PER_PAGE)
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@cache_control(max_age=settings.AUTOCOMPLETE_MAX_AGE)
+def author_autocomplete(request):
+    results = autocomplete(
+        request.GET.get('q', ''), settings.AUTOCOMPLETE_LIMIT
+    )
+    return JsonResponse(
+        {'results': results},
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+@versioned_cache_page(post_page)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
+    prefetch_thumbnails([post])
+    comments = get_comment_page(request, post_id)
     form = CommentForm()
     context = {
         'post': post,
@@ -64,6 +107,18 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@versioned_cache_page(post_page)
+def post_comments(request, post_id):
+    """Следующая порция комментариев поста отдельным фрагментом."""
+    if post_meta(request, post_id)[0] is None:
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': get_comment_page(request, post_id),
+    }
+    return render(request, 'includes/comments.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -102,23 +157,40 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    """Сохраняет комментарий.
+
+    Обычная форма возвращает на страницу поста. Запрос из скрипта
+    получает только разметку нового комментария (201) или ошибки формы
+    в JSON (400), без повторного рендера всей страницы.
+    """
+    if not Post.objects.filter(id=post_id).exists():
+        raise Http404
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
+        comment.post_id = post_id
         comment.save()
+        if request.is_ajax():
+            return render(
+                request, 'includes/comment.html', {'comment': comment},
+                status=201
+            )
+    elif request.is_ajax():
+        return JsonResponse(
+            {'errors': form.errors.get_json_data()},
+            status=400,
+            json_dumps_params={'ensure_ascii': False}
+        )
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
     title = 'Публикации авторов, на которых вы подписаны'
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request, FeedPaginator(request.user, settings.POSTS_PER_PAGE)
+    )
     context = {
         'title': title,
         'page_obj': page_obj,
@@ -146,3 +218,26 @@ def profile_unfollow(request, username):
     if data_follow.exists():
         data_follow.delete()
     return redirect('posts:profile', username)
+
+
+@login_required
+def export_posts(request):
+    """Отдает автору потоком его посты с комментариями и подписки.
+
+    Форматы: JSONL, CSV или zip с картинками.
+    """
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки.')
+    images = bool(request.GET.get('images'))
+    response = StreamingHttpResponse(
+        export_chunks(
+            Post.objects.filter(author=request.user), export_format, images,
+            follows=author_follows(request.user)
+        ),
+        content_type=CONTENT_TYPES['zip' if images else export_format]
+    )
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        export_filename(request.user.username, export_format, images)
+    )
+    return response
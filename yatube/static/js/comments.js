@@ -0,0 +1,75 @@
+// Догружает следующую порцию комментариев вместо перехода по ссылке.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('[data-more-comments]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.dataset.fragment, {credentials: 'same-origin'})
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.status);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      // Комментарий, уже дописанный после отправки, приходит и в
+      // порции: убираем дописанную копию, порция ставит его на место.
+      var fragment = document.createElement('template');
+      fragment.innerHTML = html;
+      var added = document.getElementById('new-comments');
+      fragment.content.querySelectorAll('[data-comment-id]')
+        .forEach(function (comment) {
+          var copy = added && added.querySelector(
+            '[data-comment-id="' + comment.dataset.commentId + '"]'
+          );
+          if (copy) {
+            copy.remove();
+          }
+        });
+      link.replaceWith(fragment.content);
+    })
+    .catch(function () {
+      window.location = link.href;
+    });
+});
+
+// Отправляет комментарий без перезагрузки и дописывает его в конец.
+document.addEventListener('submit', function (event) {
+  var form = event.target.closest('[data-comment-form]');
+  if (!form) {
+    return;
+  }
+  event.preventDefault();
+  var field = form.elements.text;
+  var errors = form.querySelector('[data-errors="text"]');
+  fetch(form.action, {
+    method: 'POST',
+    body: new FormData(form),
+    credentials: 'same-origin',
+    headers: {'X-Requested-With': 'XMLHttpRequest'}
+  }).then(function (response) {
+    if (response.redirected) {
+      window.location = response.url;
+    } else if (response.status === 201) {
+      return response.text().then(function (html) {
+        document.getElementById('new-comments')
+          .insertAdjacentHTML('beforeend', html);
+        form.reset();
+        field.classList.remove('is-invalid');
+      });
+    } else if (response.status === 400) {
+      return response.json().then(function (data) {
+        var messages = (data.errors.text || []).map(function (error) {
+          return error.message;
+        });
+        errors.textContent = messages.join(' ');
+        field.classList.add('is-invalid');
+      });
+    } else {
+      form.submit();
+    }
+  }).catch(function () {
+    form.submit();
+  });
+});
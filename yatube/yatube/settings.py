@@ -141,6 +141,23 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 POSTS_PER_PAGE = 10
+# Комментариев на странице поста и в каждой догружаемой порции.
+COMMENTS_PER_PAGE = 20
+
+FEED_BATCH_SIZE = 1000
+# Авторы с таким числом подписчиков читаются в ленту при показе.
+FEED_FANOUT_LIMIT = 10000
+
+# Сколько авторов возвращает подсказка и сколько секунд браузер ее хранит.
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_AGE = 60
+
+# Сколько строк import_posts пишет за одну транзакцию.
+IMPORT_BATCH_SIZE = 1000
+# Сколько строк выгрузка читает из базы за раз и сколько байт архива
+# копит перед отправкой.
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_STREAM_BUFFER = 64 * 1024
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -153,9 +170,51 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-
+# Загрузки пишутся сразу на диск, а не собираются в памяти.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Большая сторона картинки поста после обработки загрузки.
+IMAGE_MAX_SIDE = 1920
+# Больше пикселей не декодируем: защита памяти для форматов без draft.
+IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+IMAGE_QUALITY = 85
+
+# Миниатюры постов: геометрия и параметры sorl-thumbnail по имени размера.
+THUMBNAIL_SIZES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Ширины вариантов каждой миниатюры для srcset (плюс их WebP-версии).
+THUMBNAIL_VARIANT_WIDTHS = (480, 960, 1440)
+# Процессов фонового обработчика миниатюр (manage.py thumbnail_worker).
+THUMBNAIL_WORKERS = 2
+# Как часто обработчик проверяет пустую очередь, секунд.
+THUMBNAIL_POLL_INTERVAL = 1
+# Через сколько секунд задачу упавшего обработчика берет другой.
+THUMBNAIL_JOB_TIMEOUT = 60 * 5
+# Неудачная задача повторяется через THUMBNAIL_JOB_TIMEOUT; после стольких
+# попыток она остается в очереди сбойной (thumbnail_worker --retry-failed).
+THUMBNAIL_MAX_ATTEMPTS = 3
+
+# Общий для всех процессов кэш: файл SQLite плюс LRU в памяти процесса.
+# При MAX_ENTRIES записей в файле удаляется треть самых старых.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.SharedSQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'CULL_FREQUENCY': 3,
+            'L1_MAX_ENTRIES': 1000,
+        },
     }
 }
+# Тесты работают с кэшем во временном каталоге, а не с кэшем сервера.
+TEST_RUNNER = 'core.testing.TemporaryCacheRunner'
+
+# Страницы сбрасываются при изменении данных, поэтому живут долго.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+# Сколько еще отдавать устаревшую страницу, пока ее пересчитывают.
+CACHE_STALE_TIMEOUT = 60 * 60
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_POLL_INTERVAL = 0.05